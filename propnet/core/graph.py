@@ -619,6 +619,40 @@ class Graph(object):
         if not found:
             return None
 
+    def get_degrees_of_separation(self, start_property: Union[str, Symbol]) -> Dict[str, int]:
+        """
+        Returns the minimum number of models separating a property from every
+        property it is connected to, as found by a single breadth-first search.
+        Equivalent to calling get_degree_of_separation() for each end property.
+
+        Args:
+            start_property: (str, Symbol) starting Symbol type
+        Returns:
+            (dict<str, int>) degree of separation keyed by name of end property.
+                Includes start_property (degree 0), but omits properties that are
+                not connected.
+        """
+        if start_property not in self._symbol_types.keys():
+            raise ValueError("Symbol not found: " + str(start_property))
+        start_property = self._symbol_types[start_property]
+        degrees = {start_property.name: 0}
+        to_visit = [start_property]     # all properties to visit in the current depth
+        depth_count = 0
+        while to_visit:
+            depth_count += 1
+            to_visit_next = []          # all properties to visit in the next depth
+            for visiting in to_visit:
+                for model in self._input_to_model[visiting]:
+                    for output_set in model.output_sets:
+                        for property_name in output_set:
+                            connection = self._symbol_types[property_name]
+                            if connection.name in degrees:
+                                continue
+                            degrees[connection.name] = depth_count
+                            to_visit_next.append(connection)
+            to_visit = to_visit_next
+        return degrees
+
     @staticmethod
     def generate_input_sets(props, this_quantity_pool):
         """
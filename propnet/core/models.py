@@ -5,7 +5,9 @@ Module containing classes and methods for Model functionality in propnet code.
 import os
 import re
 import logging
+import operator
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from itertools import chain
 
 import six
@@ -16,7 +18,8 @@ import sympy as sp
 from sympy.parsing.sympy_parser import parse_expr
 
 from propnet.core.exceptions import ModelEvaluationError, SymbolConstraintError
-from propnet.core.quantity import QuantityFactory, NumQuantity, BaseQuantity
+from propnet.core.quantity import QuantityFactory, NumQuantity, BaseQuantity, \
+    convert_magnitude
 from propnet.core.utils import references_to_bib, PrintToLogger
 from propnet.core.provenance import ProvenanceElement
 from propnet import ureg
@@ -24,12 +27,22 @@ from pint import DimensionalityError
 
 from propnet.core.registry import Registry
 
+try:
+    import numba
+    from numba.core.errors import NumbaError
+except ImportError:
+    numba = None
+
 logger = logging.getLogger(__name__)
 
 # TODO: maybe this should go somewhere else, like a dedicated settings.py
 TEST_DATA_LOC = os.path.join(os.path.dirname(__file__), "..",
                              "models", "tests", "pymodel_test_data")
 
+# Smallest array size for which jit-compiled equations are evaluated
+# in parallel, below this threading overhead outweighs the gain
+PARALLEL_JIT_MIN_SIZE = 100000
+
 
 class Model(ABC):
     """
@@ -300,13 +313,17 @@ class Model(ABC):
 
     def _convert_inputs_for_plugin(self, inputs):
         converted_inputs = {}
+        variable_unit_map = self.variable_unit_map
         for var, quantity in inputs.items():
-            converted_inputs[var] = quantity.value
-            if self.variable_unit_map.get(var) is not None:
+            unit = variable_unit_map.get(var)
+            if unit is not None:
                 # Units are being assumed by equation and we need to strip them
                 # or pint might get angry if it has to add or subtract quantities
                 # with unmatched dimensions
-                converted_inputs[var] = quantity.to(self.variable_unit_map[var]).magnitude
+                converted_inputs[var] = convert_magnitude(quantity.magnitude,
+                                                          quantity.units, unit)
+            else:
+                converted_inputs[var] = quantity.value
         return converted_inputs
 
     def _convert_outputs_from_plugin(self, outputs):
@@ -384,6 +401,11 @@ class Model(ABC):
         contains_complex_input = any(NumQuantity.is_complex_type(v) for v in variable_value_dict.values())
         input_variable_value_dict = {k: variable_value_dict[k] for k in input_variable_quantity_dict.keys()}
 
+        # Don't bother evaluating if the outputs are bound to be NaN
+        if allow_failure and self._nan_inputs_give_nan_outputs(input_variable_value_dict):
+            return {"successful": False,
+                    "message": "Evaluation returned invalid values (NaN)"}
+
         # Plug in and check constraints
         try:
             with PrintToLogger(level="DEBUG") as plog:
@@ -442,6 +464,21 @@ class Model(ABC):
         out['successful'] = True
         return out
 
+    def _nan_inputs_give_nan_outputs(self, variable_value_dict):
+        """
+        Determines whether evaluating the model with the given inputs
+        is known to fail with NaN outputs, without evaluating it.
+        Models can't tell in general, see EquationModel.
+
+        Args:
+            variable_value_dict (dict): variable-keyed dict of values
+                to be plugged in
+
+        Returns:
+            bool: True if evaluation is known to return NaN values
+        """
+        return False
+
     @property
     def title(self):
         """
@@ -791,7 +828,11 @@ class EquationModel(Model, MSONable):
         """
 
         self.equations = equations
-        sympy_expressions = [parse_expr(eq.replace('=', '-(')+')')
+        # Solutions are not passed through sympy's simplify(), which tries
+        # many (mostly irrelevant) strategies and dominates model loading.
+        # The unsimplified solutions are equivalent and are evaluated with
+        # common subexpression elimination anyway.
+        sympy_expressions = [_parse_expression(eq.replace('=', '-(')+')')
                              for eq in equations]
         # If no connections specified, derive connections
         if connections is None:
@@ -800,7 +841,7 @@ class EquationModel(Model, MSONable):
                 connections, equations = [], []
                 for expr in sympy_expressions:
                     for var in expr.free_symbols:
-                        new = sp.solve(expr, var)
+                        new = sp.solve(expr, var, simplify=False)
                         inputs = get_vars_from_expression(new)
                         connections.append(
                             {"inputs": inputs,
@@ -815,14 +856,14 @@ class EquationModel(Model, MSONable):
                     connections.append(
                         {"inputs": inputs,
                          "outputs": outputs,
-                         "_sympy_exprs": {outputs[0]: parse_expr(input_expr)}
+                         "_sympy_exprs": {outputs[0]: _parse_expression(input_expr)}
                          })
         else:
             # TODO: I don't think this needs to be supported necessarily
             #       but it's causing problems with models with one input
             #       and two outputs where you only want one connection
             for connection in connections:
-                new = sp.solve(sympy_expressions, connection['outputs'])
+                new = sp.solve(sympy_expressions, connection['outputs'], simplify=False)
                 sympy_exprs = {str(sym): solved
                                for sym, solved in new.items()}
                 connection["_sympy_exprs"] = sympy_exprs
@@ -836,7 +877,8 @@ class EquationModel(Model, MSONable):
             register=register,
             overwrite_registry=overwrite_registry)
 
-        self._generate_lambdas()
+        # Model.__init__() has already generated the lambdas by way of the
+        # connections property, so they are not generated again here
 
     def as_dict(self):
         d = {k if not k.startswith("_") else k.split('_', 1)[1]: v
@@ -856,19 +898,70 @@ class EquationModel(Model, MSONable):
             self._generate_lambdas()
         return self._connections
 
+    @property
+    def handles_nan(self):
+        """
+        Returns (bool): True if any equation may give a valid output
+            for NaN inputs, False if NaN inputs always give NaN outputs
+        """
+        return self._handles_nan
+
+    @property
+    def returns_complex(self):
+        """
+        Returns (bool): True if any equation contains the imaginary unit,
+            i.e. may give complex outputs for real inputs
+        """
+        return self._returns_complex
+
     def _generate_lambdas(self):
+        # Connections are looked up by their input set in plug_in()
+        self._connections_by_inputs = dict()
+        self._handles_nan = False
+        self._returns_complex = False
         for connection in self._connections:
+            input_set = frozenset(connection['inputs'])
+            self._connections_by_inputs.setdefault(input_set, []).append(connection)
+            # For each output, the inputs which make it NaN if they are NaN
+            # (None if the output may not be NaN), see _nan_inputs_give_nan_outputs()
+            connection['_nan_inputs'] = dict()
             for output_var, sympy_expr in connection['_sympy_exprs'].items():
-                sp_lambda = sp.lambdify(connection['inputs'], sympy_expr)
+                exprs = sympy_expr if isinstance(sympy_expr, list) else [sympy_expr]
+                self._returns_complex |= any(expr.has(sp.I) for expr in exprs)
+                if isinstance(sympy_expr, list) or not _propagates_nan(sympy_expr):
+                    connection['_nan_inputs'][output_var] = None
+                    self._handles_nan = True
+                else:
+                    connection['_nan_inputs'][output_var] = frozenset(
+                        str(v) for v in sympy_expr.free_symbols)
                 if '_lambdas' not in connection.keys():
                     connection['_lambdas'] = dict()
+                # Plain arithmetic doesn't need sympy's code generation
+                program = _to_postfix(sympy_expr)
+                if program is not None:
+                    connection['_lambdas'][output_var] = _PostfixLambda(program)
+                    continue
+                # Common subexpressions are computed once per call
+                sp_lambda = sp.lambdify(connection['inputs'], sympy_expr, cse=True)
                 connection['_lambdas'][output_var] = sp_lambda
+                # Multi-root solutions are left to python so that complex
+                # roots can still be scrubbed in plug_in()
+                if numba is not None and not isinstance(sympy_expr, list):
+                    if '_jit_lambdas' not in connection.keys():
+                        connection['_jit_lambdas'] = dict()
+                    # Most models are never evaluated on arrays, so the
+                    # jit versions are only made on the first array call
+                    connection['_jit_lambdas'][output_var] = None
 
     def __getstate__(self):
         d = self.__dict__.copy()
-        for connection in d['_connections']:
-            if '_lambdas' in connection.keys():
-                del connection['_lambdas']
+        # Strip generated functions from copies so the live connections
+        # (and the input set lookup referencing them) are left intact
+        d['_connections'] = [{k: v for k, v in connection.items()
+                              if k not in ('_lambdas', '_jit_lambdas', '_nan_inputs')}
+                             for connection in d['_connections']]
+        for generated in ('_connections_by_inputs', '_handles_nan', '_returns_complex'):
+            d.pop(generated, None)
         return d
 
     def __setstate__(self, state):
@@ -897,6 +990,86 @@ class EquationModel(Model, MSONable):
                 converted_outputs[var] = ureg.Quantity(quantity, units=unit)
         return converted_outputs
 
+    @staticmethod
+    def _call_lambda(connection, output_var, variable_value_dict):
+        """
+        Evaluates the lambda for an output variable of a connection. Array
+        inputs are evaluated with the jit-compiled lambda if numba is
+        available, which fuses the element-wise operations into a single
+        loop, run in parallel for arrays of at least PARALLEL_JIT_MIN_SIZE
+        elements. Scalars and values with units use the sympy lambda directly,
+        since jit dispatch (and compilation) does not pay off for them.
+        Plain arithmetic equations have no jit version and always use
+        their postfix evaluator.
+
+        Args:
+            connection (dict): connection containing the lambdas
+            output_var (str): output variable to evaluate
+            variable_value_dict (dict): variable-keyed dict of values
+                to be substituted
+
+        Returns:
+            value of the output variable
+        """
+        jit_lambdas = connection.get('_jit_lambdas', {})
+        if output_var in jit_lambdas and _is_jit_compatible(variable_value_dict.values()):
+            jit_funcs = jit_lambdas[output_var]
+            if jit_funcs is None:
+                # Compilation is deferred by numba until the first call.
+                # Large arrays are split over threads by the parallel version.
+                sp_lambda = connection['_lambdas'][output_var]
+                jit_funcs = (numba.njit(sp_lambda), numba.njit(parallel=True)(sp_lambda))
+                jit_lambdas[output_var] = jit_funcs
+            serial_func, parallel_func = jit_funcs
+            size = max(np.size(v) for v in variable_value_dict.values())
+            jit_func = parallel_func if size >= PARALLEL_JIT_MIN_SIZE else serial_func
+            try:
+                return jit_func(**variable_value_dict)
+            except NumbaError:
+                # Expression uses something numba can't compile, don't try again
+                logger.debug("Could not jit-compile '{}', using python lambda".format(output_var))
+                jit_lambdas.pop(output_var)
+        return connection['_lambdas'][output_var](**variable_value_dict)
+
+    def _nan_inputs_give_nan_outputs(self, variable_value_dict):
+        """
+        Determines whether evaluating the model with the given inputs
+        is known to fail with NaN outputs, i.e. some inputs are NaN and
+        every output expression propagates NaN from at least one of them.
+        Models with constraints, and outputs with symbol constraints, are
+        always evaluated since the constraints can fail first.
+
+        Args:
+            variable_value_dict (dict): variable-keyed dict of values
+                to be plugged in
+
+        Returns:
+            bool: True if evaluation is known to return NaN values
+        """
+        if self.constraints:
+            return False
+        nan_inputs = {var for var, value in variable_value_dict.items()
+                      if _contains_nan(value)}
+        if not nan_inputs:
+            return False
+        connections = self._connections_by_inputs.get(frozenset(variable_value_dict.keys()))
+        if not connections:
+            return False
+
+        for connection in connections:
+            for output_var, output_nan_inputs in connection['_nan_inputs'].items():
+                if output_nan_inputs is None or nan_inputs.isdisjoint(output_nan_inputs):
+                    return False
+                symbol = self._variable_symbol_map[output_var]
+                if not hasattr(symbol, 'constraint'):
+                    symbol = Registry("symbols").get(symbol)
+                if symbol is None or symbol.constraint is not None:
+                    return False
+                if not (self.variable_unit_map.get(output_var)
+                        or Registry("units").get(symbol)):
+                    return False
+        return True
+
     def plug_in(self, variable_value_dict):
         """
         Equation plug-in solves the equation for all input
@@ -912,27 +1085,61 @@ class EquationModel(Model, MSONable):
         """
 
         output = {}
-        for connection in self.connections:
-            if set(connection['inputs']) == set(variable_value_dict.keys()):
-                for output_var, func in connection['_lambdas'].items():
-                    output_vals = func(**variable_value_dict)
-                    # TODO: this decision to only take max real values should
-                    #       should probably be reevaluated at some point
-                    # Scrub nan values and take max
-                    if isinstance(output_vals, list):
-                        try:
-                            output_val = max([v for v in output_vals
-                                              if not isinstance(v, complex)])
-                        except ValueError:
-                            raise ValueError("No real roots found for model {}".format(self.name))
-                    else:
-                        output_val = output_vals
-                    output.update({output_var: output_val})
+        input_set = frozenset(variable_value_dict.keys())
+        for connection in self._connections_by_inputs.get(input_set, []):
+            for output_var in connection['_lambdas'].keys():
+                output_vals = self._call_lambda(connection, output_var,
+                                                variable_value_dict)
+                # TODO: this decision to only take max real values should
+                #       should probably be reevaluated at some point
+                # Scrub nan values and take max
+                if isinstance(output_vals, list):
+                    try:
+                        output_val = max([v for v in output_vals
+                                          if not isinstance(v, complex)])
+                    except ValueError:
+                        raise ValueError("No real roots found for model {}".format(self.name))
+                else:
+                    output_val = output_vals
+                output.update({output_var: output_val})
         if not output:
             raise ValueError("No valid input set found in connections")
         else:
             return output
 
+    def evaluate_batch(self, symbol_value_dict, units=None, allow_failure=True):
+        """
+        Evaluates the model over arrays of input values in a single call.
+
+        The lambdified equations operate element-wise on numpy arrays, so
+        rather than calling evaluate() once per input set, each input is
+        packed into one array-valued quantity and every equation is
+        evaluated once for the whole batch.
+
+        Args:
+            symbol_value_dict (dict): mapping of symbol or variable names
+                to equal-length sequences of values (list, np.ndarray,
+                pint.Quantity) or array-valued BaseQuantity objects
+            units (dict): mapping of symbol or variable names to the units
+                of the supplied values. If not specified, bare values are
+                assumed to be in the units of the associated Symbol.
+            allow_failure (bool): whether or not to catch
+                errors in model evaluation
+
+        Returns:
+            dict: dictionary of output symbols with array-valued quantities,
+                along with "successful" as in evaluate()
+        """
+        units = units or {}
+        batch_quantity_dict = {}
+        for name, values in symbol_value_dict.items():
+            if not isinstance(values, (BaseQuantity, ureg.Quantity)):
+                values = np.asarray(values)
+            symbol = self.variable_symbol_map.get(name, name)
+            batch_quantity_dict[name] = QuantityFactory.to_quantity(
+                symbol, values, units=units.get(name))
+        return self.evaluate(batch_quantity_dict, allow_failure=allow_failure)
+
     @classmethod
     def from_file(cls, filename, is_builtin=False, register=True, overwrite_registry=True):
         """
@@ -1334,6 +1541,179 @@ def remap(obj, mapping):
     return new
 
 
+_POSTFIX_OPERATORS = {
+    'ADD': operator.add,
+    'MUL': operator.mul,
+    'DIV': operator.truediv,
+    'POW': operator.pow,
+}
+
+
+def _to_postfix(expression):
+    """
+    Helper function to flatten a trivial sympy expression, i.e. one
+    made up only of symbols, numeric constants, +, -, *, / and integer
+    powers without repeated subexpressions, into a postfix program
+
+    Args:
+        expression (sympy expression): expression to be flattened
+
+    Returns:
+        list of (opcode, argument) tuples, or None if the
+        expression is not trivial
+    """
+    if not isinstance(expression, sp.Basic):
+        return None
+    subexpressions = [e for e in sp.preorder_traversal(expression) if not e.is_Atom]
+    if len(subexpressions) != len(set(subexpressions)):
+        # Leave these to lambdify, which evaluates them only once
+        return None
+    program = []
+
+    def emit(expr):
+        if expr.is_Symbol:
+            program.append(('VAR', str(expr)))
+        elif expr is sp.I:
+            program.append(('CONST', 1j))
+        elif expr.is_Integer:
+            program.append(('CONST', int(expr)))
+        elif expr.is_Number or expr.is_NumberSymbol:
+            program.append(('CONST', float(expr)))
+        elif expr.is_Add or expr.is_Mul:
+            opcode = 'ADD' if expr.is_Add else 'MUL'
+            first, *rest = expr.args
+            emit(first)
+            for arg in rest:
+                emit(arg)
+                program.append((opcode, None))
+        elif expr.is_Pow and expr.exp.is_Integer:
+            if expr.exp < 0:
+                # Integer arrays can't be raised to negative powers
+                program.append(('CONST', 1))
+                emit(expr.base)
+                if expr.exp != -1:
+                    program.extend([('CONST', -int(expr.exp)), ('POW', None)])
+                program.append(('DIV', None))
+            else:
+                emit(expr.base)
+                program.extend([('CONST', int(expr.exp)), ('POW', None)])
+        else:
+            raise ValueError("Not a trivial expression: {}".format(expr))
+
+    try:
+        emit(expression)
+    except ValueError:
+        return None
+    return program
+
+
+class _PostfixLambda(object):
+    """
+    Stack-based evaluator for the postfix programs produced by
+    _to_postfix(), used in place of a lambdified function
+    """
+    __slots__ = ('program',)
+
+    def __init__(self, program):
+        self.program = program
+
+    def __call__(self, **variable_value_dict):
+        stack = []
+        for opcode, arg in self.program:
+            if opcode == 'VAR':
+                stack.append(variable_value_dict[arg])
+            elif opcode == 'CONST':
+                stack.append(arg)
+            else:
+                right = stack.pop()
+                stack.append(_POSTFIX_OPERATORS[opcode](stack.pop(), right))
+        return stack.pop()
+
+
+# Functions which return NaN for a NaN argument
+_NAN_PROPAGATING_FUNCTIONS = (
+    sp.exp, sp.log, sp.sin, sp.cos, sp.tan, sp.asin, sp.acos, sp.atan,
+    sp.sinh, sp.cosh, sp.tanh, sp.Abs,
+)
+
+
+@lru_cache(maxsize=1024)
+def _propagates_nan(expression):
+    """
+    Helper function to determine if a sympy expression evaluates to NaN
+    whenever any of its variables is NaN. This is conservative, anything
+    other than arithmetic and a few elementary functions is assumed to
+    possibly absorb NaN (e.g. 1**nan == 1, max() or piecewise functions).
+
+    Args:
+        expression (sympy expression): expression to be checked
+    """
+    if expression.is_Symbol:
+        return True
+    if expression.is_Number or expression.is_NumberSymbol or expression is sp.I:
+        return bool(expression.is_finite)
+    if expression.is_Add or expression.is_Mul or \
+            isinstance(expression, _NAN_PROPAGATING_FUNCTIONS):
+        return all(_propagates_nan(arg) for arg in expression.args)
+    if expression.is_Pow:
+        base, exp = expression.args
+        if exp.is_Number:
+            return exp != 0 and _propagates_nan(base)
+        if base.is_Number:
+            return base != 1 and bool(base.is_finite) and _propagates_nan(exp)
+    return False
+
+
+def _contains_nan(value):
+    """
+    Helper function to determine if a value (with or without units)
+    contains NaN values
+
+    Args:
+        value: scalar, list, array or pint Quantity to be checked
+    """
+    if isinstance(value, ureg.Quantity):
+        value = value.magnitude
+    try:
+        return bool(np.any(np.isnan(value)))
+    except TypeError:
+        return False
+
+
+def _is_jit_compatible(values):
+    """
+    Helper function to determine if values can be passed to a jit-compiled
+    lambda without changing the result, i.e. they are floating point or
+    complex scalars and arrays with at least one array among them
+
+    Args:
+        values (iterable): values to be checked
+    """
+    has_array = False
+    for value in values:
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind not in 'fc':
+                return False
+            has_array = True
+        elif not isinstance(value, (float, complex)):
+            return False
+    return has_array
+
+
+@lru_cache(maxsize=1024)
+def _parse_expression(expression):
+    """
+    Helper function to parse a string expression into a sympy expression.
+    Results are cached since the same equations are parsed repeatedly
+    when models are (re)built; sympy expressions are immutable, so the
+    cached objects are safe to share.
+
+    Args:
+        expression (str): string expression
+    """
+    return parse_expr(expression)
+
+
 def get_vars_from_expression(expression):
     """
     Helper function to get all sympy symbols (vars) from a string expression
@@ -1342,7 +1722,7 @@ def get_vars_from_expression(expression):
         expression (str or sympy expression): string or sympy expression
     """
     if isinstance(expression, six.string_types):
-        expression = parse_expr(expression)
+        expression = _parse_expression(expression)
     if isinstance(expression, list):
         out = list(chain.from_iterable([get_vars_from_expression(expr)
                                         for expr in expression]))
@@ -23,10 +23,88 @@ from typing import Union
 import uuid
 import copy
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def get_conversion_factor(from_units, to_units):
+    """
+    Gets the factor by which a magnitude in one unit is multiplied to
+    express it in another. Factors are cached because pint otherwise
+    rederives them from the unit definitions on every conversion.
+
+    Args:
+        from_units: (str, pint.Unit) units to convert from
+        to_units: (str, pint.Unit) units to convert to
+
+    Returns: (float) conversion factor, or None if the conversion is not
+        a scaling (e.g. degC to kelvin) and has to be done by pint
+
+    """
+    if ureg.convert(0.0, from_units, to_units) != 0.0:
+        return None
+    return ureg.convert(1.0, from_units, to_units)
+
+
+def convert_magnitude(magnitude, from_units, to_units):
+    """
+    Converts a magnitude between units, using a cached conversion
+    factor where possible.
+
+    Args:
+        magnitude: (int, float, complex, list, np.ndarray) value to convert
+        from_units: (str, pint.Unit) units of the magnitude
+        to_units: (str, pint.Unit) units to convert the magnitude to
+
+    Returns: (float, complex, np.ndarray) magnitude in the new units
+
+    """
+    if isinstance(from_units, (str, ureg.Unit)) and isinstance(to_units, (str, ureg.Unit)):
+        factor = get_conversion_factor(from_units, to_units)
+        if factor is not None:
+            if isinstance(magnitude, list):
+                magnitude = np.asarray(magnitude)
+            # Like pint, leave the type alone if no scaling is needed
+            return magnitude if factor == 1 else magnitude * factor
+    return ureg.Quantity(magnitude, from_units).to(to_units).magnitude
+
+
+def _convert_pint_quantity(quantity, units):
+    """
+    Converts a pint Quantity to the specified units, see convert_magnitude()
+
+    Args:
+        quantity: (pint.Quantity) quantity to convert
+        units: (str, tuple, list, pint.Unit) units to convert to
+
+    Returns: (pint.Quantity) quantity in the new units
+
+    """
+    if isinstance(units, (str, ureg.Unit)):
+        return ureg.Quantity(convert_magnitude(quantity.magnitude, quantity.units, units),
+                             units)
+    return quantity.to(units)
+
+
+@lru_cache(maxsize=256)
+def _parse_units(units):
+    """
+    Gets the pint Unit for a units string, so that the same units are not
+    parsed again every time a scalar quantity is created. Only the Unit is
+    shared: pint Quantities can be modified in place, so a new one is made
+    for each value.
+
+    Args:
+        units: (str, pint.Unit) units to parse
+
+    Returns: (pint.Unit) parsed units
+
+    """
+    return ureg.Unit(units)
+
+
 class BaseQuantity(ABC, MSONable):
     """
     Base class for storing the value of a property.
@@ -478,9 +556,13 @@ class NumQuantity(BaseQuantity):
         units = units or symbol_type.units
 
         if isinstance(value, self._ACCEPTABLE_DTYPES):
-            value_in = ureg.Quantity(value.item(), units)
+            value = value.item()
+
+        if type(value) in self._ACCEPTABLE_SCALAR_TYPES and \
+                isinstance(units, (str, ureg.Unit)):
+            value_in = ureg.Quantity(value, _parse_units(units))
         elif isinstance(value, ureg.Quantity):
-            value_in = value.to(units)
+            value_in = _convert_pint_quantity(value, units)
         elif self.is_acceptable_type(value):
             value_in = ureg.Quantity(value, units)
         else:
@@ -494,9 +576,9 @@ class NumQuantity(BaseQuantity):
             if isinstance(uncertainty, self._ACCEPTABLE_DTYPES):
                 self._uncertainty = ureg.Quantity(uncertainty.item(), units)
             elif isinstance(uncertainty, ureg.Quantity):
-                self._uncertainty = uncertainty.to(units)
+                self._uncertainty = _convert_pint_quantity(uncertainty, units)
             elif isinstance(uncertainty, NumQuantity):
-                self._uncertainty = uncertainty._value.to(units)
+                self._uncertainty = _convert_pint_quantity(uncertainty._value, units)
             elif isinstance(uncertainty, tuple):
                 self._uncertainty = ureg.Quantity.from_tuple(uncertainty).to(units)
             elif self.is_acceptable_type(uncertainty):
@@ -547,9 +629,9 @@ class NumQuantity(BaseQuantity):
         # Calling deepcopy() instead of ctor preserves internal_id
         # while returning a new object (as is desired?)
         q = copy.deepcopy(self)
-        q._value = q._value.to(units)
+        q._value = _convert_pint_quantity(q._value, units)
         if q._uncertainty is not None:
-            q._uncertainty = q._uncertainty.to(units)
+            q._uncertainty = _convert_pint_quantity(q._uncertainty, units)
         return q
 
     @classmethod
@@ -4,11 +4,16 @@ This also enforces a single instance per name
 """
 
 import abc
+from collections.abc import Mapping
+from itertools import count
 
 
 class RegistryMeta(abc.ABCMeta):
 
     all_instances = None
+    # Registries that are views of other registries rather than
+    # stores of their own, keyed by registry name
+    views = dict()
 
     def __init__(cls, name, bases, nmspc):
         super(RegistryMeta, cls).__init__(name, bases, nmspc)
@@ -30,7 +35,8 @@ class RegistryMeta(abc.ABCMeta):
             raise ValueError("Must specify a name to get a Registry")
 
         if name not in cls.all_instances:
-            new_object = super(RegistryMeta, cls).__call__(*args, **kwargs)
+            registry_cls = RegistryMeta.views.get(name, cls)
+            new_object = super(RegistryMeta, registry_cls).__call__(*args, **kwargs)
             cls.all_instances[name] = new_object
 
         return cls.all_instances[name]
@@ -40,4 +46,104 @@ class RegistryMeta(abc.ABCMeta):
 
 
 class Registry(dict, metaclass=RegistryMeta):
-    pass
+    """
+    Dictionary of named objects. Keys of non-builtin entries (those with
+    ``is_builtin`` set to False) are tracked in ``_user_keys`` so they
+    can be found without scanning every builtin entry.
+    """
+
+    # Source of registry versions, shared so that no two registries
+    # (including ones created after clear_all_registries()) share a version
+    _versions = count()
+
+    def __init__(self, *args, **kwargs):
+        super(Registry, self).__init__()
+        self._user_keys = set()
+        self._version = next(Registry._versions)
+        self.update(*args, **kwargs)
+
+    @property
+    def version(self):
+        """
+        Returns (int): number that changes whenever the registry is
+            modified, for caching results that depend on its contents
+        """
+        return self._version
+
+    def __setitem__(self, key, value):
+        super(Registry, self).__setitem__(key, value)
+        self._version = next(Registry._versions)
+        if getattr(value, 'is_builtin', True):
+            self._user_keys.discard(key)
+        else:
+            self._user_keys.add(key)
+
+    def __delitem__(self, key):
+        super(Registry, self).__delitem__(key)
+        self._version = next(Registry._versions)
+        self._user_keys.discard(key)
+
+    def pop(self, key, *default):
+        value = super(Registry, self).pop(key, *default)
+        self._version = next(Registry._versions)
+        self._user_keys.discard(key)
+        return value
+
+    def popitem(self):
+        key, value = super(Registry, self).popitem()
+        self._version = next(Registry._versions)
+        self._user_keys.discard(key)
+        return key, value
+
+    def clear(self):
+        super(Registry, self).clear()
+        self._version = next(Registry._versions)
+        self._user_keys.clear()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+class UnitRegistryView(Mapping, metaclass=RegistryMeta):
+    """
+    Read-only view of the units of the symbols in Registry("symbols"),
+    served as Registry("units"). Units are stored on each Symbol, so
+    keeping a parallel dict in sync on every registration is unnecessary.
+
+    Units are changed by registering or unregistering the symbol, the
+    view itself does not support item assignment or removal.
+    """
+
+    @staticmethod
+    def _symbols():
+        return Registry("symbols")
+
+    def __getitem__(self, key):
+        # Symbol stores its units in the same format_babel() form
+        # that used to be written to this registry
+        return self._symbols()[key]._units
+
+    def get(self, key, default=None):
+        symbol = self._symbols().get(key)
+        return default if symbol is None else symbol._units
+
+    def __contains__(self, key):
+        return key in self._symbols()
+
+    def __iter__(self):
+        return iter(self._symbols())
+
+    def __len__(self):
+        return len(self._symbols())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+RegistryMeta.views["units"] = UnitRegistryView
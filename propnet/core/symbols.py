@@ -2,7 +2,6 @@
 
 import six
 import numpy as np
-from copy import copy
 
 from monty.json import MSONable
 from ruamel.yaml import safe_dump
@@ -30,6 +29,14 @@ class Symbol(MSONable):
     .yaml files are read in from the symbols folder.
 
     """
+    # Symbols are long-lived and numerous, so attributes are stored in
+    # slots. MSONable has no slots, so a __dict__ is still available but
+    # is not populated by Symbol itself.
+    __slots__ = ('object_type', '_object_class', '_object_module', 'name',
+                 'category', '_raw_units', '_unit_string', '_unit',
+                 'display_names', 'display_symbols',
+                 'shape', 'comment', 'default_value', '_is_builtin',
+                 '_constraint', '_constraint_func')
 
     def __init__(self, name, display_names=None, display_symbols=None,
                  units=None, shape=None, object_type=None, comment=None,
@@ -91,6 +98,13 @@ class Symbol(MSONable):
         self._object_class = None
         self._object_module = None
 
+        # Scalars are by far the most common shape, so they skip the
+        # shape validation below
+        if isinstance(shape, list) and len(shape) == 1:
+            is_scalar_shape = type(shape[0]) is int and shape[0] == 1
+        else:
+            is_scalar_shape = type(shape) is int and shape == 1
+
         if category in ('property', 'condition'):
 
             if object_type is not None:
@@ -98,21 +112,18 @@ class Symbol(MSONable):
                     "Cannot define an object type for a {}.".format(category))
 
             try:
-                np.zeros(shape)
+                if not is_scalar_shape:
+                    np.zeros(shape)
             except TypeError:
                 raise TypeError(
                     "Shape provided for ({}) is invalid.".format(name))
 
             if units is None:
-                units = 1 * ureg.dimensionless
-            elif isinstance(units, six.string_types):
-                units = 1 * ureg.parse_expression(units)
-            elif isinstance(units, (tuple, list)):
-                units = ureg.Quantity.from_tuple(units)
-            else:
+                units = 'dimensionless'
+            elif not isinstance(units, six.string_types + (tuple, list)):
                 raise TypeError("Cannot parse unit format: {}".format(units))
-
-            units = units.units.format_babel()
+            # Units of builtin symbols are only parsed by pint when first
+            # needed, see _units. They are checked by the symbol tests.
         else:
             if units is not None:
                 raise ValueError("Cannot define units for generic objects.")
@@ -140,20 +151,31 @@ class Symbol(MSONable):
 
         self.name = name
         self.category = category
-        self._units = units
+        self._raw_units = units
+        self._unit_string = None
+        self._unit = None
         self.display_names = display_names
         self.display_symbols = display_symbols
         # If a user enters [1] or [1, 1, ...] for shape, treat as a scalar
-        if shape and np.size(np.zeros(shape=shape)) == 1:
+        if is_scalar_shape:
             shape = 1
-        # If a user enters a 0 dimension, throw an error
-        if shape and np.size(np.zeros(shape=shape)) == 0:
-            raise ValueError("Symbol cannot have a shape with a 0-size dimension: {}".format(shape))
+        elif shape:
+            size = np.size(np.zeros(shape=shape))
+            if size == 1:
+                shape = 1
+            # If a user enters a 0 dimension, throw an error
+            elif size == 0:
+                raise ValueError("Symbol cannot have a shape with a 0-size dimension: {}".format(shape))
         self.shape = shape
         self.comment = comment
         self.default_value = default_value
         self._is_builtin = is_builtin
 
+        if not is_builtin:
+            # Report invalid units where the symbol is defined rather
+            # than wherever they are first used
+            _ = self._units
+
         # TODO: This should explicity deal with only numerical symbols
         #       because it uses sympy to evaluate them until we make
         #       a class to evaluate them using either sympy or a custom func
@@ -188,12 +210,12 @@ class Symbol(MSONable):
                 name is already registered, this error is raised.
 
         """
-        if not overwrite_registry and \
-                (self.name in Registry("symbols").keys() or self.name in Registry("units").keys()):
-            raise KeyError("Symbol '{}' already exists in the symbol or unit registry".format(self.name))
+        if not overwrite_registry and self.name in Registry("symbols").keys():
+            raise KeyError("Symbol '{}' already exists in the symbol registry".format(self.name))
 
+        # Registry("units") is a view of the symbol registry,
+        # so there is nothing to register there
         Registry("symbols")[self.name] = self
-        Registry("units")[self.name] = self.units.format_babel() if self.units else None
         if self.default_value is not None:
             Registry("symbol_values")[self.name] = self.default_value
 
@@ -203,7 +225,6 @@ class Symbol(MSONable):
 
         """
         Registry("symbols").pop(self.name, None)
-        Registry("units").pop(self.name, None)
         Registry("symbol_values").pop(self.name, None)
 
     @property
@@ -231,11 +252,26 @@ class Symbol(MSONable):
             return self._constraint_func
         return None
 
+    def _get_attributes(self):
+        d = {k: getattr(self, k) for k in self.__slots__ if hasattr(self, k)}
+        d.update(self.__dict__)
+        return d
+
     def __getstate__(self):
-        d = copy(self.__dict__)
+        d = self._get_attributes()
         d['_constraint_func'] = None
+        d['_unit'] = None
         return d
 
+    def __setstate__(self, state):
+        if '_units' in state:
+            # Symbols pickled before units were parsed lazily
+            state = dict(state, _raw_units=state['_units'],
+                         _unit_string=state['_units'], _unit=None)
+            state.pop('_units')
+        for k, v in state.items():
+            setattr(self, k, v)
+
     @property
     def is_builtin(self):
         """
@@ -247,9 +283,28 @@ class Symbol(MSONable):
         """
         return self._is_builtin
 
+    @property
+    def _units(self):
+        """
+        Gets the units of the symbol as a string, parsing the units
+        the symbol was created with on first access.
+
+        Returns:
+            str: units in pint's babel format, None for object symbols
+        """
+        if self._unit_string is None and self._raw_units is not None:
+            if isinstance(self._raw_units, six.string_types):
+                units = 1 * ureg.parse_expression(self._raw_units)
+            else:
+                units = ureg.Quantity.from_tuple(self._raw_units)
+            self._unit_string = units.units.format_babel()
+        return self._unit_string
+
     @property
     def units(self):
-        return ureg.Unit(self._units) if self._units else None
+        if self._unit is None and self._units:
+            self._unit = ureg.Unit(self._units)
+        return self._unit
 
     @property
     def object_class(self):
@@ -324,10 +379,15 @@ class Symbol(MSONable):
         else:
             raise AttributeError("Object type not defined for symbol of category '{}'".format(self.category))
 
+    # Symbols are identified by name only, which also lets them be looked
+    # up by name in dicts and sets. Python caches string hashes, so there
+    # is nothing to gain from caching a hash here.
     def __hash__(self):
         return self.name.__hash__()
 
     def __eq__(self, other):
+        if other is self:
+            return True
         if isinstance(other, Symbol):
             return self.name == other.name
         elif isinstance(other, str):
@@ -343,7 +403,7 @@ class Symbol(MSONable):
         Prints a full summary of the symbol
         """
         to_return = self.name + ":\n"
-        for k, v in self.__dict__.items():
+        for k, v in self._get_attributes().items():
             to_return += "\t" + k + ":\t" + str(v) + "\n"
         return to_return
 
@@ -95,11 +95,10 @@ class GraphTest(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        non_builtin_syms = [k for k, v in Registry("symbols").items() if not v.is_builtin]
+        non_builtin_syms = list(Registry("symbols")._user_keys)
         for sym in non_builtin_syms:
             Registry("symbols").pop(sym)
-            Registry("units").pop(sym)
-        non_builtin_models = [k for k, v in Registry("models").items() if not v.is_builtin]
+        non_builtin_models = list(Registry("models")._user_keys)
         for model in non_builtin_models:
             Registry("models").pop(model)
 
@@ -922,6 +921,25 @@ class GraphTest(unittest.TestCase):
             self.assertTrue(i in ans_2,
                             "Incorrect paths generated.")
 
+    def test_get_degrees_of_separation(self):
+        """
+        Tests that the degrees of separation from one symbol to all others
+        agree with the degree of separation between each pair of symbols.
+        """
+        symbols = GraphTest.generate_canonical_symbols()
+        models = GraphTest.generate_canonical_models()
+        g = Graph(symbol_types=symbols, models=models, composite_models=dict())
+
+        for start in symbols.keys():
+            degrees = g.get_degrees_of_separation(start)
+            self.assertEqual(degrees[start], 0)
+            for end in symbols.keys():
+                self.assertEqual(degrees.get(end),
+                                 g.get_degree_of_separation(start, end))
+
+        with self.assertRaises(ValueError):
+            g.get_degrees_of_separation('not_a_symbol')
+
     def test_evaluate_composite(self):
         """
         Tests the graph's composite material evaluation.
@@ -1,5 +1,6 @@
 import unittest
 
+import cmath
 import math
 import numpy as np
 
@@ -14,15 +15,20 @@ from propnet.core.registry import Registry
 
 
 class ModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Dimensionless scalar symbols shared by the tests below
+        cls.A_dim = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1)
+        cls.B_dim = Symbol('b', ['B'], ['B'], units='dimensionless', shape=1)
+        cls.C_dim = Symbol('c', ['C'], ['C'], units='dimensionless', shape=1)
+        cls.D_dim = Symbol('d', ['D'], ['D'], units='dimensionless', shape=1)
+
     @classmethod
     def tearDownClass(cls):
-        non_builtin_syms = [k for k, v in Registry("symbols").items() if not v.is_builtin]
-        for sym in non_builtin_syms:
-            Registry("symbols").pop(sym)
-            Registry("units").pop(sym)
-        non_builtin_models = [k for k, v in Registry("models").items() if not v.is_builtin]
-        for model in non_builtin_models:
-            Registry("models").pop(model)
+        # Only non-builtin entries need to be removed
+        for registry in (Registry("symbols"), Registry("models")):
+            for key in list(registry._user_keys):
+                registry.pop(key)
 
     def test_unit_handling(self):
         """
@@ -38,10 +44,12 @@ class ModelTest(unittest.TestCase):
         """
         L = Symbol('l', ['L'], ['L'], units=[1.0, [['centimeter', 1.0]]], shape=[1])
         A = Symbol('a', ['A'], ['A'], units=[1.0, [['centimeter', 2.0]]], shape=[1])
+        # 'a' shadows the shared dimensionless symbol, so restore it afterwards
+        self.addCleanup(self.A_dim.register, overwrite_registry=True)
 
+        symbols = Registry("symbols")
         for sym in (L, A):
-            Registry("symbols")[sym] = sym
-            Registry("units")[sym] = sym.units
+            symbols[sym] = sym
 
         get_area_config = {
             'name': 'area',
@@ -57,15 +65,112 @@ class ModelTest(unittest.TestCase):
         self.assertTrue(math.isclose(out['a'].magnitude, 200.0))
         self.assertTrue(out['a'].units == A.units)
 
+    def test_unit_handling_batch(self):
+        L = Symbol('l', ['L'], ['L'], units=[1.0, [['centimeter', 1.0]]], shape=[1])
+        A = Symbol('a', ['A'], ['A'], units=[1.0, [['centimeter', 2.0]]], shape=[1])
+        self.addCleanup(self.A_dim.register, overwrite_registry=True)
+
+        model = EquationModel('area', ['a = l1 * l2'],
+                              variable_symbol_map={"a": A, "l1": L, "l2": L})
+        n = 50
+        l1 = np.linspace(1, 2, n)
+        l2 = np.linspace(2, 4, n)
+        out = model.evaluate_batch({'l1': l1, 'l2': l2},
+                                   units={'l1': 'meter'}, allow_failure=False)
+
+        self.assertTrue(out['successful'])
+        self.assertEqual(out['a'].magnitude.shape, (n,))
+        self.assertTrue(np.allclose(out['a'].magnitude, 100 * l1 * l2))
+        self.assertTrue(out['a'].units == A.units)
+
+    def test_evaluate_batch_large(self):
+        # Unitless array inputs take the jit-compiled path if numba is
+        # installed and the numpy lambda otherwise, compiled only once
+        A = self.A_dim
+        B = self.B_dim
+        C = self.C_dim
+        model = EquationModel('product_for_batch', ['a = sqrt(b) * c'],
+                              variable_symbol_map={'a': A, 'b': B, 'c': C},
+                              units_for_evaluation=True)
+        # The jit versions are only made once arrays are evaluated
+        jit_lambdas = model.connections[0].get('_jit_lambdas', {})
+        self.assertIsNone(jit_lambdas.get('a'))
+        b = np.random.rand(10**6)
+        c = np.random.rand(10**6)
+        model.evaluate_batch({'b': b[:1], 'c': c[:1]}, allow_failure=False)
+        if jit_lambdas:
+            self.assertIsNotNone(jit_lambdas['a'])
+        for _ in range(2):
+            out = model.evaluate_batch({'b': b, 'c': c}, allow_failure=False)
+            self.assertTrue(np.allclose(out['a'].magnitude, np.sqrt(b) * c))
+
+        # Large arrays are evaluated in parallel, small ones serially,
+        # both agree with evaluating the scalars one at a time
+        small = model.evaluate_batch({'b': b[:10], 'c': c[:10]}, allow_failure=False)
+        for i in range(10):
+            scalar = model.plug_in({'b': float(b[i]), 'c': float(c[i])})['a']
+            self.assertTrue(math.isclose(out['a'].magnitude[i], scalar))
+            self.assertTrue(math.isclose(small['a'].magnitude[i], scalar))
+
+        # Complex inputs compile to a separate specialization
+        out = model.evaluate_batch({'b': b + 1j, 'c': c}, allow_failure=False)
+        self.assertTrue(np.allclose(out['a'].magnitude, np.sqrt(b + 1j) * c))
+
+        # Functions numba can't compile fall back to the python lambda
+        model = EquationModel('gamma_for_batch', ['a = gamma(b)'],
+                              variable_symbol_map={'a': A, 'b': B},
+                              units_for_evaluation=True)
+        out = model.evaluate_batch({'b': [1., 2., 3.]}, allow_failure=False)
+        self.assertTrue(np.allclose(out['a'].magnitude, [1., 1., 2.]))
+
+    def test_trivial_equations(self):
+        # Plain arithmetic is evaluated without lambdify and gives the same
+        # results for scalars, arrays and quantities with units
+        model = EquationModel('trivial_arithmetic', ['a = (b - 2*c) / d**2 + 1'],
+                              variable_symbol_map={'a': self.A_dim, 'b': self.B_dim,
+                                                   'c': self.C_dim, 'd': self.D_dim})
+        connection = model.connections[0]
+        self.assertNotIn('_jit_lambdas', connection)
+        out = model.plug_in({'b': 7, 'c': 1, 'd': 2})
+        self.assertTrue(math.isclose(out['a'], 2.25))
+        out = model.evaluate_batch({'b': [7, 3], 'c': [1, 1], 'd': [2, 1]},
+                                   allow_failure=False)
+        self.assertTrue(np.allclose(out['a'].magnitude, [2.25, 2.]))
+
+    def test_common_subexpressions(self):
+        # Repeated subexpressions in an equation should only be evaluated once
+        class CountingFloat(float):
+            additions = 0
+
+            def __add__(self, other):
+                CountingFloat.additions += 1
+                return float(self) + other
+
+        model = EquationModel('repeated_subexpression', ['a = (b + c)**2 + (b + c)**3'],
+                              variable_symbol_map={'a': self.A_dim, 'b': self.B_dim,
+                                                   'c': self.C_dim})
+        out = model.plug_in({'b': CountingFloat(1.), 'c': 2.})
+        self.assertTrue(math.isclose(out['a'], 36.0))
+        self.assertEqual(CountingFloat.additions, 1)
+
+    def test_solve_for_all_variables(self):
+        model = EquationModel('solved_for_all', ['a = (b + c) / d'],
+                              variable_symbol_map={'a': self.A_dim, 'b': self.B_dim,
+                                                   'c': self.C_dim, 'd': self.D_dim},
+                              solve_for_all_variables=True)
+        values = {'a': 2.0, 'b': 1.0, 'c': 3.0, 'd': 2.0}
+        self.assertEqual(len(model.connections), 4)
+        for connection in model.connections:
+            output = connection['outputs'][0]
+            out = model.plug_in({k: values[k] for k in connection['inputs']})
+            self.assertTrue(math.isclose(out[output], values[output]))
+
     def test_model_returns_nan(self):
         # This tests model failure with scalar nan.
         # Quantity class has other more thorough tests.
 
-        A = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1)
-        B = Symbol('b', ['B'], ['B'], units='dimensionless', shape=1)
-        for sym in (B, A):
-            Registry("symbols")[sym] = sym
-            Registry("units")[sym] = sym.units
+        A = self.A_dim
+        B = self.B_dim
         get_config = {
             'name': 'equality',
             # 'connections': [{'inputs': ['b'], 'outputs': ['a']}],
@@ -79,15 +184,27 @@ class ModelTest(unittest.TestCase):
         self.assertFalse(out['successful'])
         self.assertEqual(out['message'], 'Evaluation returned invalid values (NaN)')
 
+        # NaN input is known to give a NaN output without evaluating,
+        # unless the equation may absorb it (1**nan == 1)
+        self.assertTrue(model._nan_inputs_give_nan_outputs({'b': float('nan')}))
+        self.assertFalse(model._nan_inputs_give_nan_outputs({'b': 1.0}))
+        self.assertFalse(model.handles_nan)
+        self.assertFalse(model.returns_complex)
+        model = EquationModel('power', ['a = b**c'],
+                              variable_symbol_map={'a': A, 'b': B, 'c': self.C_dim})
+        self.assertFalse(model._nan_inputs_give_nan_outputs({'b': 1.0, 'c': float('nan')}))
+        self.assertTrue(model.handles_nan)
+        out = model.evaluate({'b': QuantityFactory.create_quantity(B, 1.0),
+                              'c': QuantityFactory.create_quantity(self.C_dim, float('nan'))},
+                             allow_failure=True)
+        self.assertTrue(out['successful'])
+
     def test_model_returns_complex(self):
         # This tests model failure with scalar complex.
         # Quantity class has other more thorough tests.
 
-        A = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1)
-        B = Symbol('b', ['B'], ['B'], units='dimensionless', shape=1)
-        for sym in (B, A):
-            Registry("symbols")[sym] = sym
-            Registry("units")[sym] = sym.units
+        A = self.A_dim
+        B = self.B_dim
         get_config = {
             'name': 'add_complex_value',
             # 'connections': [{'inputs': ['b'], 'outputs': ['a']}],
@@ -96,6 +213,7 @@ class ModelTest(unittest.TestCase):
             'variable_symbol_map': {"a": A, "b": B}
         }
         model = EquationModel(**get_config)
+        self.assertTrue(model.returns_complex)
         out = model.evaluate({'b': QuantityFactory.create_quantity(B, 5)},
                              allow_failure=True)
         self.assertFalse(out['successful'])
@@ -104,13 +222,13 @@ class ModelTest(unittest.TestCase):
         out = model.evaluate({'b': QuantityFactory.create_quantity(B, 5j)},
                              allow_failure=True)
         self.assertTrue(out['successful'])
-        self.assertTrue(np.isclose(out['a'].magnitude, 6j))
+        self.assertTrue(cmath.isclose(complex(out['a'].magnitude), 6j, abs_tol=1e-9))
 
     def test_model_register_unregister(self):
-        A = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1)
-        B = Symbol('b', ['B'], ['B'], units='dimensionless', shape=1)
-        C = Symbol('c', ['C'], ['C'], units='dimensionless', shape=1)
-        D = Symbol('d', ['D'], ['D'], units='dimensionless', shape=1)
+        A = self.A_dim
+        B = self.B_dim
+        C = self.C_dim
+        D = self.D_dim
         m = EquationModel('equation_model_to_remove', ['a = b * 3'], variable_symbol_map={'a': A, 'b': B})
         self.assertIn(m.name, Registry("models"))
         self.assertTrue(m.registered)
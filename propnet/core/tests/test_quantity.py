@@ -1,5 +1,6 @@
 import unittest
 import os
+import math
 
 import numpy as np
 from monty import tempfile
@@ -10,7 +11,8 @@ import logging
 from pymatgen.util.testing import PymatgenTest
 from propnet.core.symbols import Symbol
 from propnet.core.exceptions import SymbolConstraintError
-from propnet.core.quantity import QuantityFactory, NumQuantity, ObjQuantity
+from propnet.core.quantity import QuantityFactory, NumQuantity, ObjQuantity, \
+    get_conversion_factor
 from propnet.core.materials import Material
 from propnet.core.graph import Graph
 from propnet import ureg
@@ -35,10 +37,9 @@ class QuantityTest(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        non_builtin_syms = [k for k, v in Registry("symbols").items() if not v.is_builtin]
+        non_builtin_syms = list(Registry("symbols")._user_keys)
         for sym in non_builtin_syms:
             Registry("symbols").pop(sym)
-            Registry("units").pop(sym)
 
     def test_quantity_construction(self):
         # From custom numerical symbol
@@ -309,6 +310,26 @@ class QuantityTest(unittest.TestCase):
         quantity = QuantityFactory.create_quantity(self.custom_object_symbol, {'a': True})
         self.assertEqual(quantity.pretty_string(), "{'a': True}")
 
+        # Scalar constants share their parsed units but not their pint quantity
+        q = QuantityFactory.create_quantity(self.custom_symbol, float('nan'))
+        q2 = QuantityFactory.create_quantity(self.custom_symbol, float('nan'))
+        self.assertIsNot(q, q2)
+        self.assertIsNot(q._value, q2._value)
+        self.assertTrue(math.isnan(q2.magnitude))
+        self.assertNotEqual(q.provenance.source['source_key'],
+                            q2.provenance.source['source_key'])
+        q = QuantityFactory.create_quantity(self.custom_symbol, 0)
+        self.assertIsInstance(q.magnitude, int)
+        q = QuantityFactory.create_quantity(self.custom_symbol, -0.0)
+        self.assertEqual(math.copysign(1, q.magnitude), -1)
+
+        # Changing a value in place doesn't affect later ones
+        q = QuantityFactory.create_quantity('band_gap', 1.0, 'eV')
+        q._value.ito('joule')
+        q2 = QuantityFactory.create_quantity('band_gap', 1.0, 'eV')
+        self.assertEqual(q2.magnitude, 1.0)
+        self.assertEqual(q2.units, ureg.Unit('eV'))
+
     def test_to(self):
         quantity = QuantityFactory.create_quantity('band_gap', 3.0, 'eV')
         new = quantity.to('joules')
@@ -324,6 +345,16 @@ class QuantityTest(unittest.TestCase):
         self.assertAlmostEqual(new.uncertainty.magnitude, 1.60217653e-20)
         self.assertEqual(new.uncertainty.units.format_babel(), 'joule')
 
+        # Conversion factors are cached, offset units are left to pint
+        get_conversion_factor.cache_clear()
+        for _ in range(3):
+            new = QuantityFactory.create_quantity('band_gap', 3.0, 'eV').to('joules')
+            self.assertAlmostEqual(new.magnitude, 4.80652959e-19)
+        self.assertEqual(get_conversion_factor.cache_info().misses, 1)
+        self.assertIsNone(get_conversion_factor('degC', 'kelvin'))
+        quantity = QuantityFactory.create_quantity('temperature', 300, 'kelvin')
+        self.assertAlmostEqual(quantity.to('degC').magnitude, 26.85)
+
     def test_properties(self):
         # Test units, magnitude
         q = QuantityFactory.create_quantity("bulk_modulus", 100)
@@ -1,6 +1,8 @@
 import unittest
+import json
 
 from propnet.core.registry import Registry
+from propnet.core.symbols import Symbol
 
 
 class RegistryTest(unittest.TestCase):
@@ -21,6 +23,59 @@ class RegistryTest(unittest.TestCase):
         Registry.clear_all_registries()
         self.assertNotIn('to_clear', Registry.all_instances.keys())
 
+    def test_user_keys(self):
+        class Entry(object):
+            def __init__(self, is_builtin):
+                self.is_builtin = is_builtin
+
+        test_reg = Registry("user_keys")
+        test_reg['builtin'] = Entry(True)
+        test_reg['user'] = Entry(False)
+        test_reg['data'] = 'data'
+        self.assertEqual(test_reg._user_keys, {'user'})
+        test_reg['user'] = Entry(True)
+        self.assertEqual(test_reg._user_keys, set())
+        test_reg.update(user=Entry(False))
+        self.assertEqual(test_reg._user_keys, {'user'})
+        test_reg.pop('user')
+        self.assertEqual(test_reg._user_keys, set())
+        Registry.all_instances.pop("user_keys")
+
+    def test_version(self):
+        test_reg = Registry("versions")
+        versions = [test_reg.version]
+        test_reg['entry'] = 'data'
+        versions.append(test_reg.version)
+        test_reg.pop('entry')
+        versions.append(test_reg.version)
+        test_reg.clear()
+        versions.append(test_reg.version)
+        versions.append(Registry("other_versions").version)
+        self.assertEqual(len(set(versions)), len(versions))
+        Registry.all_instances.pop("versions")
+        Registry.all_instances.pop("other_versions")
+
+    def test_units_registry_view(self):
+        symbol = Symbol('units_view_test', units='meter')
+        self.addCleanup(symbol.unregister)
+        units = Registry("units")
+        self.assertEqual(units['units_view_test'], symbol._units)
+        self.assertEqual(units, {name: s._units
+                                 for name, s in Registry("symbols").items()})
+        self.assertEqual(json.loads(json.dumps(dict(units)))['units_view_test'],
+                         symbol._units)
+
+        # Units follow the symbol registry and can't be written directly
+        with self.assertRaises(TypeError):
+            units['units_view_test'] = 'second'
+        with self.assertRaises(TypeError):
+            del units['units_view_test']
+        with self.assertRaises(KeyError):
+            _ = units['not_a_symbol']
+
+        symbol.unregister()
+        self.assertNotIn('units_view_test', units)
+
 
 if __name__ == "__main__":
     unittest.main()
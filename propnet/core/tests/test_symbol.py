@@ -1,7 +1,10 @@
 import unittest
+import pickle
 
 from propnet.core.symbols import Symbol
 from propnet.core.registry import Registry
+from propnet import ureg
+from pint.errors import UndefinedUnitError
 
 
 class SymbolTest(unittest.TestCase):
@@ -13,6 +16,23 @@ class SymbolTest(unittest.TestCase):
     def tearDownClass(cls):
         Registry.clear_all_registries()
 
+    def test_unit_parsing(self):
+        # Units of user symbols are parsed, and checked, on construction
+        with self.assertRaises(UndefinedUnitError):
+            Symbol('invalid_units', units='not_a_unit', register=False)
+
+        # Units of builtin symbols are parsed when first needed
+        symbol = Symbol('builtin_units', units='not_a_unit', is_builtin=True,
+                        register=False)
+        self.assertIsNone(symbol._unit_string)
+        with self.assertRaises(UndefinedUnitError):
+            _ = symbol.units
+        symbol = Symbol('builtin_units', units=[1.0, [["gigapascal", 1.0]]],
+                        is_builtin=True, register=False)
+        self.assertIsNone(symbol._unit_string)
+        self.assertEqual(symbol.units, ureg.Unit('gigapascal'))
+        self.assertEqual(symbol._unit_string, 'gigapascal')
+
     def test_property_construction(self):
         sample_symbol_type_dict = {
             'name': 'youngs_modulus',
@@ -33,6 +53,22 @@ class SymbolTest(unittest.TestCase):
 
         self.assertEqual(sample_symbol_type,
                          Symbol.from_dict(sample_symbol_type_dict))
+        self.assertEqual(sample_symbol_type._unit_string, 'gigapascal')
+        self.assertEqual(sample_symbol_type.units, ureg.Unit('gigapascal'))
+        self.assertEqual(Registry("units")['youngs_modulus'], 'gigapascal')
+        self.assertEqual(hash(sample_symbol_type),
+                         hash(Symbol.from_dict(sample_symbol_type_dict)))
+        # Symbols can be found by name
+        self.assertIn('youngs_modulus', {sample_symbol_type})
+
+    def test_pickle(self):
+        A = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1,
+                   constraint='a > 0', register=False)
+        self.assertTrue(A.constraint(1))
+        A_copy = pickle.loads(pickle.dumps(A))
+        self.assertEqual(A_copy, A)
+        self.assertEqual(A_copy.units, A.units)
+        self.assertTrue(A_copy.constraint(1))
 
     def test_symbol_register_unregister(self):
         A = Symbol('a', ['A'], ['A'], units='dimensionless', shape=1)
@@ -1,19 +1,34 @@
 from maggma.builders import Builder
+from maggma.utils import grouper
+from joblib import Parallel, delayed
 from itertools import combinations_with_replacement
 import numpy as np
 import json
 from collections import defaultdict
+from functools import lru_cache
 from propnet.core.graph import Graph
 from propnet import ureg
+import hashlib
 import logging
+import random
 import re
+import threading
 
 # noinspection PyUnresolvedReferences
 import propnet.models
 from propnet.core.registry import Registry
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 logger = logging.getLogger(__name__)
 
+_CFUNC_RE = re.compile(r'^_cfunc_(.+)$')
+# Holds the regressors reused by the correlation functions in each thread
+_thread_local = threading.local()
+
 
 class CorrelationBuilder(Builder):
     """
@@ -27,12 +42,18 @@ class CorrelationBuilder(Builder):
     """
     PROPNET_PROPS = [v.name for v in Registry("symbols").values()
                      if (v.category == 'property' and v.shape == 1)]
+    # Maximum number of documents written to the correlation store at once
+    UPDATE_BATCH_SIZE = 1000
+    # Correlation functions which fit models to the data, and so are too costly
+    # to run on data sets with fewer points than this or with constant data
+    EXPENSIVE_FUNCS = ('mic', 'ransac', 'theilsen')
+    EXPENSIVE_FUNCS_MIN_POINTS = 20
     
     def __init__(self, propnet_store,
                  correlation_store, out_file=None,
                  funcs='linlsq', props=None,
                  sample_size=None, from_quantity_db=True,
-                 **kwargs):
+                 workers=1, **kwargs):
         """
         Constructor for the correlation builder.
 
@@ -60,6 +81,10 @@ class CorrelationBuilder(Builder):
                 schema, False means the full, material-indexed database schema. Note: querying quantity-indexed
                 databases is considerably faster than material-indexed.
                 Default: True (quantity schema)
+            workers (int): number of processes used by run() to evaluate the correlation
+                functions of each chunk of items in parallel with joblib. -1 uses all CPUs.
+                Default: 1 (serial). Note: this does not apply when the builder is run
+                in a maggma Runner, which calls process_item() itself.
             **kwargs: arguments to the Builder superclass
         """
 
@@ -94,7 +119,15 @@ class CorrelationBuilder(Builder):
         if sample_size is not None and sample_size < 2:
             raise ValueError("Sample size must be greater than 1")
         self.sample_size = sample_size
+        if workers == 0:
+            raise ValueError("Number of workers cannot be 0")
+        self.workers = workers
         self.total = None
+        # Per-property data from the quantity database, keyed by property name,
+        # as dicts of averaged values keyed by material key, see _load_prop()
+        self._prop_cache = {}
+        self._quantity_db_indexed = False
+        self._path_lengths = self._get_path_lengths(self._props)
 
         super(CorrelationBuilder, self).__init__(sources=[propnet_store],
                                                  targets=[correlation_store],
@@ -109,10 +142,46 @@ class CorrelationBuilder(Builder):
             dict: dict of function handles keyed by name
 
         """
-        return {f.replace('_cfunc_', ''): getattr(cls, f)
-                for f in dir(cls)
-                if re.match(r'^_cfunc_.+$', f) and callable(getattr(cls, f))}
+        return dict(cls._find_correlation_funcs())
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _find_correlation_funcs(cls):
+        # Looking functions up on the class is only done once per class,
+        # get_correlation_funcs() returns a copy so the cache can't be modified
+        funcs = {}
+        for f in dir(cls):
+            match = _CFUNC_RE.match(f)
+            if match and callable(getattr(cls, f)):
+                funcs[match.group(1)] = getattr(cls, f)
+        return funcs
     
+    @staticmethod
+    def _get_path_lengths(props):
+        """
+        Calculates the degree of separation on the propnet graph between all
+        pairs of properties, as these don't depend on the data being correlated.
+
+        Args:
+            props (`list` of `str`): names of properties
+
+        Returns:
+            dict: length of the shortest path keyed by (start property, end property)
+                tuple, which is None if the properties are not connected
+        """
+        g = Graph()
+        path_lengths = {}
+        for prop_x in props:
+            # One search from each property finds its distance to all others
+            try:
+                degrees = g.get_degrees_of_separation(prop_x)
+            except ValueError:
+                # This shouldn't happen...but just in case
+                degrees = {}
+            for prop_y in props:
+                path_lengths[(prop_x, prop_y)] = degrees.get(prop_y)
+        return path_lengths
+
     def get_items(self):
         """
         Accumulates data and generates data sets for pairs of properties coupled
@@ -123,19 +192,44 @@ class CorrelationBuilder(Builder):
         """
         self.total = len(self._props) ** 2 * len(self._funcs)
 
+        if self.from_quantity_db:
+            self._quantity_db_indexed = self.ensure_quantity_db_index(self.propnet_store)
+        # Each document written by update_targets() is upserted by its id,
+        # which is a collection scan per document without an index
+        if not self.correlation_store.ensure_index('id'):
+            logger.warning("Could not add index for property id. "
+                           "Writing correlations may be slow.")
+
         # combinations_with_replacement() produces all possible pairs of properties
         # without repeating, i.e. will give AB but not BA. Code below manually
         # produces "BA" so that we don't have to re-query the database.
         for prop_x, prop_y in combinations_with_replacement(self._props, 2):
             if self.from_quantity_db:
-                data = self.get_data_from_quantity_db(self.propnet_store,
-                                                      prop_x, prop_y,
-                                                      sample_size=self.sample_size)
+                data = self._get_data_from_prop_cache(prop_x, prop_y)
             else:
                 data = self.get_data_from_full_db(prop_x, prop_y)
 
             yield from self._make_data_combinations(prop_x, prop_y, data)
 
+    @staticmethod
+    def ensure_quantity_db_index(store):
+        """
+        Ensures the quantity-only propnet database has the compound index
+        on symbol type and material key used to select quantities in
+        get_data_from_quantity_db().
+
+        Args:
+            store (maggma.stores.Store): MongoDB store instance for quantity database
+
+        Returns:
+            bool: True if the index exists or was created
+        """
+        if not store.ensure_index([('symbol_type', 1), ('material_key', 1)]):
+            logger.warning("Could not add index on symbol_type and material_key. "
+                           "Querying the quantity database may be slow.")
+            return False
+        return True
+
     @staticmethod
     def get_data_from_quantity_db(store, *props, sample_size=None, include_id=False):
         """
@@ -152,33 +246,43 @@ class CorrelationBuilder(Builder):
                 key for the record. Default: False (do not include the field)
 
         Returns:
-            dict: dictionary of data keyed by property name
+            dict: dictionary of data keyed by property name, as arrays of floats.
+                Material keys are a list under '_id' if include_id is True.
 
         """
 
         # This aggregation query collects the quantities, groups them by material
-        # and averages the values for that material, then samples them (if specified)
+        # and averages the values for that material, then samples them (if specified).
+        # The $in match can use the index on symbol type (see ensure_quantity_db_index())
+        # and only the fields needed for grouping are passed on to $group.
         match_stage = {
             '$match': {
-                '$or': [
-                    {'symbol_type': prop} for prop in props
-                ]}
+                'symbol_type': {'$in': list(props)}
+            }
+        }
+        project_stage = {
+            '$project': {
+                'material_key': 1, 'symbol_type': 1, 'value': 1, '_id': 0
+            }
+        }
+        # Values are averaged per material and property with a single accumulator,
+        # then collected per material as a list of {'k': property, 'v': average}
+        # pairs, which avoids evaluating a conditional per property in $group
+        average_stage = {
+            '$group': {
+                '_id': {'m': '$material_key', 's': '$symbol_type'},
+                'v': {'$avg': '$value'}
+            }
         }
-        group_stage = {'$group': {'_id': '$material_key'}}
-        for prop in props:
-            group_stage['$group'].update({
-                prop: {
-                    '$avg': {
-                        '$cond': [
-                            {"$eq": ['$symbol_type', prop]},
-                            '$value',
-                            None
-                        ]
-                    }
-                }
-            })
-        pipeline = [match_stage, group_stage]
+        collect_stage = {
+            '$group': {
+                '_id': '$_id.m',
+                'vals': {'$push': {'k': '$_id.s', 'v': '$v'}}
+            }
+        }
+        pipeline = [match_stage, project_stage, average_stage, collect_stage]
 
+        # Sampling has to follow grouping so that materials, not quantities, are sampled
         if sample_size is not None:
             pipeline.append(
                 {'$sample': {'size': sample_size}}
@@ -191,14 +295,75 @@ class CorrelationBuilder(Builder):
 
         data = defaultdict(list)
         for m in query:
-            if all(m[prop] is not None and np.isfinite(m[prop])
+            values = {v['k']: v['v'] for v in m['vals']}
+            if all(values.get(prop) is not None and np.isfinite(values[prop])
                    for prop in props):
                 for prop in props:
-                    data[prop].append(m[prop])
+                    data[prop].append(values[prop])
                 if include_id:
                     data['_id'].append(m['_id'])
 
-        return dict(data)
+        # Correlation functions work on arrays, so convert once here
+        out = {prop: np.array(data[prop], dtype=np.float64) for prop in props}
+        if include_id:
+            out['_id'] = data['_id']
+        return out
+
+    def _load_prop(self, prop):
+        """
+        Collects scalar data for a single property from the quantity-only
+        propnet database, averaged by material. Each property is only queried
+        once per builder, as its data is reused for every pair it is part of.
+
+        Args:
+            prop (str): property name
+
+        Returns:
+            dict: averaged values of the property keyed by material key
+        """
+        if prop not in self._prop_cache:
+            pipeline = [{'$match': {'symbol_type': prop}}]
+            if self._quantity_db_indexed:
+                # The index on (symbol_type, material_key) returns the matches
+                # in order of material key without sorting, and sorted input
+                # lets $group finish each material as it goes rather than
+                # holding (and possibly spilling to disk) all groups at once
+                pipeline.append({'$sort': {'material_key': 1}})
+            pipeline.extend([
+                {'$project': {'material_key': 1, 'value': 1, '_id': 0}},
+                {'$group': {'_id': '$material_key', 'v': {'$avg': '$value'}}}
+            ])
+            query = self.propnet_store.collection.aggregate(
+                pipeline=pipeline,
+                allowDiskUse=True
+            )
+            self._prop_cache[prop] = {m['_id']: m['v'] for m in query
+                                      if m['v'] is not None and np.isfinite(m['v'])}
+        return self._prop_cache[prop]
+
+    def _get_data_from_prop_cache(self, prop_x, prop_y):
+        """
+        Gets data for a pair of properties from the materials which have both,
+        sampled if desired. Gives the same data as get_data_from_quantity_db()
+        but reuses the data of each property (see _load_prop()).
+
+        Args:
+            prop_x (str): name of property x
+            prop_y (str): name of property y
+
+        Returns:
+            dict: dictionary of data keyed by property name, as arrays of floats
+        """
+        x_values = self._load_prop(prop_x)
+        y_values = self._load_prop(prop_y)
+        material_keys = [k for k in x_values.keys() if k in y_values]
+        if self.sample_size is not None and len(material_keys) > self.sample_size:
+            material_keys = random.sample(material_keys, self.sample_size)
+
+        return {prop_x: np.fromiter((x_values[k] for k in material_keys),
+                                    dtype=np.float64, count=len(material_keys)),
+                prop_y: np.fromiter((y_values[k] for k in material_keys),
+                                    dtype=np.float64, count=len(material_keys))}
 
     def get_data_from_full_db(self, prop_x, prop_y):
         """
@@ -210,7 +375,7 @@ class CorrelationBuilder(Builder):
             prop_y (str): name of property y
 
         Returns:
-            dict: dictionary of data keyed by property name
+            dict: dictionary of data keyed by property name, as arrays of floats
 
         """
 
@@ -239,8 +404,9 @@ class CorrelationBuilder(Builder):
                 pipeline, allowDiskUse=True
             )
 
-        x_unit = Registry("units")[prop_x]
-        y_unit = Registry("units")[prop_y]
+        units_reg = Registry("units")
+        x_unit = units_reg[prop_x]
+        y_unit = units_reg[prop_y]
         data = defaultdict(list)
         for material in pn_data:
             # Collect all data with units for this material
@@ -253,20 +419,28 @@ class CorrelationBuilder(Builder):
                 props = (prop_x, prop_y)
                 units = (x_unit, y_unit)
             for prop, unit in zip(props, units):
-                qs = [ureg.Quantity(q['value'], q['units'])
-                      for q in material['inputs']
-                      if q['symbol_type'] == prop]
+                # Values are grouped by their units so that only the mean of
+                # each group is converted, rather than every value
+                values_by_unit = defaultdict(list)
+                for q in material['inputs']:
+                    if q['symbol_type'] == prop:
+                        values_by_unit[q['units']].append(q['value'])
                 if prop in material:
-                    qs.extend([ureg.Quantity(q['value'], q['units'])
-                               for q in material[prop]['quantities']])
+                    for q in material[prop]['quantities']:
+                        values_by_unit[q['units']].append(q['value'])
 
-                if len(qs) == 0:
+                if len(values_by_unit) == 0:
                     raise ValueError("Query for property {} gave no results"
                                      "".format(prop))
-                prop_mean = sum(qs) / len(qs)
-                data[prop].append(prop_mean.to(unit).magnitude)
+                n_values, prop_sum = 0, 0.0
+                for value_units, values in values_by_unit.items():
+                    unit_mean = ureg.Quantity(np.mean(values), value_units)
+                    prop_sum += unit_mean.to(unit).magnitude * len(values)
+                    n_values += len(values)
+                data[prop].append(prop_sum / n_values)
 
-        return data
+        return {prop: np.array(data[prop], dtype=np.float64)
+                for prop in (prop_x, prop_y)}
 
     def _make_data_combinations(self, prop_x, prop_y, data):
         """
@@ -278,11 +452,12 @@ class CorrelationBuilder(Builder):
             data (dict): dictionary of data keyed by property name
 
         Returns: (generator) a generator providing a dictionary with the data for correlation:
-            {'x_data': (list<float>) data for independent property (x-axis),
+            {'x_data': (np.ndarray<float>) data for independent property (x-axis),
              'x_name': (str) name of independent property,
-             'y_data': (list<float>) data for dependent property (y-axis),
+             'y_data': (np.ndarray<float>) data for dependent property (y-axis),
              'y_name': (str) name of dependent property,
-             'func': (tuple<str, function>) name and function handle for correlation function
+             'func': (tuple<str, function>) name and function handle for correlation function,
+             'result': (float) optional, correlation value if it was already calculated
              }
 
         """
@@ -291,6 +466,20 @@ class CorrelationBuilder(Builder):
             prop_combos = ((prop_x, prop_x),)
         else:
             prop_combos = ((prop_x, prop_y), (prop_y, prop_x))
+
+        # Pearson r and R^2 are symmetric and derived from the same r, so r is
+        # calculated once for the pair instead of for each function and direction
+        results = {}
+        if prop_x == prop_y:
+            # Data correlate perfectly with themselves, unless they are constant
+            values = data[prop_x]
+            if len(values) >= 2 and np.isfinite(values).all() and np.ptp(values) > 0:
+                results = {'pearson': 1.0, 'linlsq': 1.0, 'spearman': 1.0}
+        elif ('pearson' in self._funcs or 'linlsq' in self._funcs) and len(data[prop_x]) >= 2:
+            r = _pearson_r(data[prop_x], data[prop_y])
+            if r is not None:
+                results = {'pearson': r, 'linlsq': r ** 2}
+
         for x, y in prop_combos:
             for name, func in self._funcs.items():
                 data_dict = {'x_data': data[x],
@@ -298,6 +487,8 @@ class CorrelationBuilder(Builder):
                              'y_data': data[y],
                              'y_name': y,
                              'func': (name, func)}
+                if name in results:
+                    data_dict['result'] = results[name]
                 yield data_dict
 
     def process_item(self, item):
@@ -320,33 +511,77 @@ class CorrelationBuilder(Builder):
                     not preclude y->x having a forward path.
 
         """
-        prop_x, prop_y = item['x_name'], item['y_name']
-        data_x, data_y = item['x_data'], item['y_data']
-        func_name, func = item['func']
-        n_points = len(data_x)
+        return self._make_output(item, self._correlate(item))
 
-        g = Graph()
+    def run(self):
+        """
+        Runs the builder without a maggma Runner. With more than one worker,
+        the correlation functions for each chunk of items are evaluated in
+        parallel processes, as they are independent and CPU-bound.
+        """
+        if self.workers == 1:
+            return super(CorrelationBuilder, self).run()
+
+        self.connect()
+        cursor = self.get_items()
+        with Parallel(n_jobs=self.workers) as parallel:
+            for chunk in grouper(cursor, self.chunk_size):
+                items = [item for item in chunk if item is not None]
+                self.logger.info("Processing batch of {} items".format(len(items)))
+                # Only the function and data are sent to the workers, not the builder
+                results = parallel(delayed(self._correlate)(item) for item in items)
+                self.update_targets([self._make_output(item, result)
+                                     for item, result in zip(items, results)])
+        self.finalize(cursor)
+
+    @classmethod
+    def _correlate(cls, item):
+        """
+        Evaluates the correlation function of an item from get_items().
+
+        Args:
+            item: (dict) input provided by get_items() (see get_items() for structure)
+
+        Returns: (float, Exception) correlation value, or the exception raised
+            by the correlation function. Expensive functions are not evaluated
+            for too few points or constant data, which gives a ValueError.
+        """
+        n_points = len(item['x_data'])
+        if n_points < 2:
+            return 0.0
+        if 'result' in item:
+            return item['result']
+        func_name, func = item['func']
+        if func_name in cls.EXPENSIVE_FUNCS:
+            if n_points < cls.EXPENSIVE_FUNCS_MIN_POINTS:
+                return ValueError("Too few data points to evaluate {} "
+                                  "({} < {})".format(func_name, n_points,
+                                                     cls.EXPENSIVE_FUNCS_MIN_POINTS))
+            if np.ptp(item['x_data']) == 0 or np.ptp(item['y_data']) == 0:
+                return ValueError("Cannot evaluate {} for constant data".format(func_name))
         try:
-            path_length_xy = g.get_degree_of_separation(prop_x, prop_y)
-            path_length_yx = g.get_degree_of_separation(prop_y, prop_x)
-        except ValueError:
-            # This shouldn't happen...but just in case
-            path_length_xy = None
-            path_length_yx = None
+            return func(item['x_data'], item['y_data'])
+        except Exception as ex:
+            # If correlation fails, catch the error, save it, and move on
+            return ex
+
+    def _make_output(self, item, result):
+        """
+        Combines the result of a correlation with information about the item
+        it was calculated for. See process_item() for the output format.
+        """
+        prop_x, prop_y = item['x_name'], item['y_name']
+        func_name, _ = item['func']
+        n_points = len(item['x_data'])
+
+        path_length_xy = self._path_lengths[(prop_x, prop_y)]
+        path_length_yx = self._path_lengths[(prop_y, prop_x)]
 
         try:
             path_length = min(path_length_xy, path_length_yx)
         except TypeError:
             path_length = path_length_xy or path_length_yx
 
-        if n_points < 2:
-            result = 0.0
-        else:
-            try:
-                result = func(data_x, data_y)
-            except Exception as ex:
-                # If correlation fails, catch the error, save it, and move on
-                result = ex
         return prop_x, prop_y, result, func_name, n_points, path_length
 
     @staticmethod
@@ -378,9 +613,13 @@ class CorrelationBuilder(Builder):
         Returns: (float) R^2 value
 
         """
-        from scipy import stats
-        fit = stats.linregress(x, y)
-        return fit.rvalue ** 2
+        r = _pearson_r(x, y)
+        if r is None:
+            # Let scipy deal with (or complain about) degenerate data
+            from scipy import stats
+            fit = stats.linregress(x, y)
+            return fit.rvalue ** 2
+        return r ** 2
 
     @staticmethod
     def _cfunc_pearson(x, y):
@@ -394,9 +633,13 @@ class CorrelationBuilder(Builder):
         Returns: (float) Pearson R value
 
         """
-        from scipy import stats
-        fit = stats.pearsonr(x, y)
-        return fit[0]
+        r = _pearson_r(x, y)
+        if r is None:
+            # Let scipy deal with (or complain about) degenerate data
+            from scipy import stats
+            fit = stats.pearsonr(x, y)
+            return fit[0]
+        return r
 
     @staticmethod
     def _cfunc_spearman(x, y):
@@ -410,6 +653,15 @@ class CorrelationBuilder(Builder):
         Returns: (float) Spearman R value
 
         """
+        # Spearman r is Pearson r of the ranks of the data
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if x.ndim == 1 and x.shape == y.shape \
+                and np.isfinite(x).all() and np.isfinite(y).all():
+            r = _pearson_r(_rank(x), _rank(y))
+            if r is not None:
+                return r
+        # Let scipy deal with (or complain about) degenerate data
         from scipy import stats
         fit = stats.spearmanr(x, y)
         return fit[0]
@@ -427,8 +679,8 @@ class CorrelationBuilder(Builder):
 
         """
         from sklearn.linear_model import RANSACRegressor
-        r = RANSACRegressor(random_state=21)
-        x_coeff = np.array(x)[:, np.newaxis]
+        r = _get_regressor(RANSACRegressor)
+        x_coeff = np.ascontiguousarray(x, dtype=np.float64).reshape(-1, 1)
         r.fit(x_coeff, y)
         return r.score(x_coeff, y)
 
@@ -445,8 +697,8 @@ class CorrelationBuilder(Builder):
 
         """
         from sklearn.linear_model import TheilSenRegressor
-        r = TheilSenRegressor(random_state=21)
-        x_coeff = np.array(x)[:, np.newaxis]
+        r = _get_regressor(TheilSenRegressor)
+        x_coeff = np.ascontiguousarray(x, dtype=np.float64).reshape(-1, 1)
         r.fit(x_coeff, y)
         return r.score(x_coeff, y)
 
@@ -466,7 +718,7 @@ class CorrelationBuilder(Builder):
                  'correlation_func': func_name,
                  'n_points': n_points,
                  'shortest_path_length': path_length,
-                 'id': hash((prop_x, prop_y)) ^ hash(func_name)}
+                 'id': self._get_correlation_id(prop_x, prop_y, func_name)}
             if not isinstance(result, Exception):
                 d['correlation'] = result
             else:
@@ -474,7 +726,27 @@ class CorrelationBuilder(Builder):
                 d['error'] = (result.__class__.__name__,
                               result.args)
             data.append(d)
-        self.correlation_store.update(data, key='id')
+        # The store upserts each batch with a single bulk write
+        for chunk in grouper(data, self.UPDATE_BATCH_SIZE):
+            self.correlation_store.update([d for d in chunk if d is not None], key='id')
+
+    @staticmethod
+    def _get_correlation_id(prop_x, prop_y, func_name):
+        """
+        Generates the key of a correlation document. Unlike hash(), which is salted
+        per interpreter, this is the same in every run, so re-running the builder
+        updates existing documents instead of adding new ones.
+
+        Args:
+            prop_x: (str) name of independent property (x-axis)
+            prop_y: (str) name of dependent property (y-axis)
+            func_name: (str) name of correlation function
+
+        Returns: (str) hex digest identifying the correlation
+
+        """
+        key = "{}|{}|{}".format(prop_x, prop_y, func_name)
+        return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
 
     def finalize(self, cursor=None):
         """
@@ -491,6 +763,12 @@ class CorrelationBuilder(Builder):
         for prop in props_to_index:
             if not self.correlation_store.ensure_index(prop):
                 logger.warning("Could not add index for property {}".format(prop))
+        # Supports get_correlation_matrices(), which selects by function
+        if not self.correlation_store.ensure_index([('correlation_func', 1),
+                                                    ('property_x', 1),
+                                                    ('property_y', 1)]):
+            logger.warning("Could not add index on correlation_func, property_x "
+                           "and property_y")
 
         if self.out_file:
             try:
@@ -546,31 +824,41 @@ class CorrelationBuilder(Builder):
         if isinstance(func_name, str):
             func_name = [func_name]
 
+        # All functions are queried at once and the documents are sorted by function
+        docs_by_func = defaultdict(list)
+        for d in self.correlation_store.query(
+                criteria={'correlation_func': {'$in': list(func_name)}},
+                properties=['property_x', 'property_y', 'correlation_func', 'correlation',
+                            'n_points', 'shortest_path_length']):
+            docs_by_func[d['correlation_func']].append(d)
+
+        n_props = len(props)
+        prop_idx = {prop: i for i, prop in enumerate(props)}
         for f in func_name:
-            data = self.correlation_store.query(criteria={'correlation_func': f})
-            corr_matrix: list = np.zeros(shape=(len(props), len(props))).tolist()
+            docs = docs_by_func[f]
+            ia = np.fromiter((prop_idx[d['property_x']] for d in docs),
+                             dtype=int, count=len(docs))
+            ib = np.fromiter((prop_idx[d['property_y']] for d in docs),
+                             dtype=int, count=len(docs))
+
+            # Failed correlations are None, which becomes NaN in the float
+            # matrix, so they are tracked separately to be written as None
+            corr_matrix = np.zeros(shape=(n_props, n_props))
+            corr_matrix[ia, ib] = [d['correlation'] for d in docs]
+            corr_none = np.zeros(shape=(n_props, n_props), dtype=bool)
+            corr_none[ia, ib] = [d['correlation'] is None for d in docs]
+            out['correlation'][f] = _matrix_to_list(corr_matrix, corr_none)
 
-            fill_info_matrices = False
             if not out['n_points'] and not out['shortest_path_length']:
-                fill_info_matrices = True
-                out['n_points'] = np.zeros(shape=(len(props), len(props))).tolist()
-                out['shortest_path_length'] = np.zeros(shape=(len(props), len(props))).tolist()
-
-            for d in data:
-                prop_x, prop_y, correlation, n_points, path_length = d['property_x'], \
-                                                                     d['property_y'], \
-                                                                     d['correlation'], \
-                                                                     d['n_points'], \
-                                                                     d['shortest_path_length']
-                ia, ib = props.index(prop_x), props.index(prop_y)
-                corr_matrix[ia][ib] = correlation
-
-                if fill_info_matrices:
-                    out['n_points'][ia][ib] = n_points
-                    out['n_points'][ib][ia] = n_points
-                    out['shortest_path_length'][ia][ib] = path_length
-
-            out['correlation'][f] = corr_matrix
+                n_points = np.zeros(shape=(n_props, n_props), dtype=int)
+                n_points[ia, ib] = [d['n_points'] for d in docs]
+                n_points[ib, ia] = n_points[ia, ib]
+                path_length = np.zeros(shape=(n_props, n_props), dtype=int)
+                path_length[ia, ib] = [d['shortest_path_length'] or 0 for d in docs]
+                path_none = np.zeros(shape=(n_props, n_props), dtype=bool)
+                path_none[ia, ib] = [d['shortest_path_length'] is None for d in docs]
+                out['n_points'] = _matrix_to_list(n_points)
+                out['shortest_path_length'] = _matrix_to_list(path_length, path_none)
 
         return out
 
@@ -596,3 +884,127 @@ class CorrelationBuilder(Builder):
 
         d['funcs'] = serialized_funcs
         return d
+
+
+def _pearson_r(x, y):
+    """
+    Calculates the Pearson correlation coefficient of a data set directly,
+    rather than with scipy, which also calculates p-values, slopes, etc.
+    Uses a jit-compiled loop if numba is installed, as the data sets are
+    usually small enough for numpy's overhead to dominate.
+
+    Args:
+        x: (list<float>, np.ndarray) independent property (x-axis)
+        y: (list<float>, np.ndarray) dependent property (y-axis)
+
+    Returns: (float) Pearson R value, or None if it is undefined for the data
+        (e.g. if either property is constant)
+
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if numba is not None and x.ndim == 1 and x.shape == y.shape:
+        r = _pearson_nb(x, y)
+        if not np.isfinite(r):
+            return None
+    else:
+        xm = x - x.mean()
+        ym = y - y.mean()
+        denominator = np.sqrt((xm @ xm) * (ym @ ym))
+        if denominator == 0 or not np.isfinite(denominator):
+            return None
+        r = (xm @ ym) / denominator
+    # Clip rounding errors like scipy does
+    return float(min(max(r, -1.0), 1.0))
+
+
+def _get_regressor(regressor_class):
+    """
+    Gets an instance of a scikit-learn regressor, created once per thread
+    and reused, as fitting resets its state. The fixed random state makes
+    every fit the same as with a new instance.
+
+    Args:
+        regressor_class: (type) scikit-learn regressor class taking random_state
+
+    Returns: instance of regressor_class
+
+    """
+    regressors = getattr(_thread_local, 'regressors', None)
+    if regressors is None:
+        regressors = _thread_local.regressors = {}
+    if regressor_class not in regressors:
+        regressors[regressor_class] = regressor_class(random_state=21)
+    return regressors[regressor_class]
+
+
+def _matrix_to_list(matrix, none_mask=None):
+    """
+    Converts a matrix to a list of lists for serialization.
+
+    Args:
+        matrix: (np.ndarray) 2D array
+        none_mask: (np.ndarray<bool>) optional, 2D array which is True where
+            the list should contain None instead of the value in the matrix
+
+    Returns: (list<list>) matrix as a list of lists
+
+    """
+    out = matrix.tolist()
+    if none_mask is not None:
+        for i, j in zip(*np.nonzero(none_mask)):
+            out[i][j] = None
+    return out
+
+
+def _rank(a):
+    """
+    Ranks data from 1 to n, giving tied values the average of their ranks
+    like scipy.stats.rankdata(), which is only used if there are ties.
+
+    Args:
+        a: (np.ndarray<float>) 1D array of data
+
+    Returns: (np.ndarray<float>) ranks of the data
+
+    """
+    order = np.argsort(a, kind='mergesort')
+    sorted_a = a[order]
+    if np.any(sorted_a[1:] == sorted_a[:-1]):
+        from scipy.stats import rankdata
+        return rankdata(a)
+    ranks = np.empty(a.size, dtype=np.float64)
+    ranks[order] = np.arange(1, a.size + 1)
+    return ranks
+
+
+if numba is not None:
+    # The signature makes numba compile (or load from cache) on import, rather
+    # than on the first call, which may be in each of a pool of workers
+    @numba.njit('float64(float64[::1], float64[::1])', cache=True)
+    def _pearson_nb(x, y):
+        # Centers the data before summing products, which is less prone to
+        # cancellation than the single-pass formula. Gives NaN if undefined.
+        n = x.size
+        if n < 2:
+            return np.nan
+        mx = 0.0
+        my = 0.0
+        for i in range(n):
+            mx += x[i]
+            my += y[i]
+        mx /= n
+        my /= n
+        sxx = 0.0
+        syy = 0.0
+        sxy = 0.0
+        for i in range(n):
+            dx = x[i] - mx
+            dy = y[i] - my
+            sxx += dx * dx
+            syy += dy * dy
+            sxy += dx * dy
+        denominator = np.sqrt(sxx * syy)
+        if denominator == 0.0:
+            return np.nan
+        return sxy / denominator
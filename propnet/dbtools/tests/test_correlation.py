@@ -101,6 +101,42 @@ class CorrelationTest(unittest.TestCase):
         runner = Runner([builder], max_workers=4)
         runner.run()
 
+    def test_parallel_workers(self):
+        results = []
+        for workers in (1, 2):
+            correlation_store = MemoryStore()
+            builder = CorrelationBuilder(self.quantity_store, correlation_store,
+                                         props=self.propnet_props,
+                                         funcs=['linlsq', 'spearman'],
+                                         from_quantity_db=True,
+                                         workers=workers)
+            builder.run()
+            results.append({(d['property_x'], d['property_y'], d['correlation_func']):
+                            d['correlation'] for d in correlation_store.query()})
+        self.assertEqual(len(results[0]), len(self.propnet_props) ** 2 * 2)
+        self.assertEqual(results[0].keys(), results[1].keys())
+        for k, v in results[0].items():
+            self.assertAlmostEqual(v, results[1][k])
+
+    def test_quantity_db_prop_cache(self):
+        builder = CorrelationBuilder(self.quantity_store, self.correlation,
+                                     props=self.propnet_props,
+                                     from_quantity_db=True)
+        items = list(builder.get_items())
+        self.assertEqual(set(builder._prop_cache.keys()), set(self.propnet_props))
+
+        # Cached data are the same as queried for the pair directly
+        prop_x, prop_y = 'bulk_modulus', 'vickers_hardness'
+        expected = CorrelationBuilder.get_data_from_quantity_db(self.quantity_store,
+                                                                prop_x, prop_y)
+        for item in items:
+            if item['x_name'] == prop_x and item['y_name'] == prop_y:
+                self.assertEqual(sorted(zip(item['x_data'], item['y_data'])),
+                                 sorted(zip(expected[prop_x], expected[prop_y])))
+                break
+        else:
+            self.fail("No item for {} and {}".format(prop_x, prop_y))
+
     def test_process_item(self):
         test_props = [['band_gap_pbe', 'atomic_density'],
                       ['bulk_modulus', 'vickers_hardness']]
@@ -160,6 +196,26 @@ class CorrelationTest(unittest.TestCase):
                 self.assertEqual(n_points, 200)
                 self.assertEqual(path_length, 2)
 
+    def test_expensive_funcs_skipped(self):
+        builder = CorrelationBuilder(self.propstore, self.correlation,
+                                     props=['vickers_hardness', 'bulk_modulus'],
+                                     funcs=['ransac', 'linlsq'], sample_size=10,
+                                     from_quantity_db=False)
+        for item in builder.get_items():
+            _, _, correlation, func_name, n_points, _ = builder.process_item(item)
+            self.assertEqual(n_points, 10)
+            if func_name == 'ransac':
+                self.assertIsInstance(correlation, ValueError)
+            else:
+                self.assertIsInstance(correlation, float)
+
+    def test_spearman_ties(self):
+        from scipy import stats
+        x = [1., 2., 2., 3., 5., 5., 5.]
+        y = [2., 1., 4., 3., 7., 6., 6.]
+        self.assertAlmostEqual(CorrelationBuilder._cfunc_spearman(x, y),
+                               stats.spearmanr(x, y)[0])
+
     def test_database_and_file_write(self):
         builder = CorrelationBuilder(self.propstore, self.correlation,
                                      props=self.propnet_props,
@@ -233,7 +233,7 @@ class StorageTest(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        non_builtin_syms = [k for k, v in Registry("symbols").items() if not v.is_builtin]
+        non_builtin_syms = list(Registry("symbols")._user_keys)
         for sym in non_builtin_syms:
             Registry("symbols").pop(sym)
 
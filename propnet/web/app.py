@@ -15,9 +15,8 @@ from propnet.web.layout_refs import refs_layout
 
 from dash_cytoscape import load_extra_layouts
 
-from propnet.web.utils import parse_path
+from propnet.web.utils import parse_path, cache
 
-from flask_caching import Cache
 import logging
 
 log = logging.getLogger(__name__)
@@ -33,7 +32,7 @@ app.scripts.config.serve_locally = True
 app.title = "propnet"
 route = dcc.Location(id='url', refresh=False)
 
-cache = Cache(app.server, config={
+cache.init_app(app.server, config={
     'CACHE_TYPE': 'filesystem', 'CACHE_DIR': '.tmp'
 })
 
@@ -16,15 +16,12 @@ from dash.exceptions import PreventUpdate
 
 import plotly.graph_objs as go
 
-from pymatgen import MPRester
-
 from pymongo.errors import ServerSelectionTimeoutError
 
 import logging
 import numpy as np
 
 logger = logging.getLogger(__name__)
-mpr = MPRester()
 
 try:
     store = loadfn(
@@ -4,7 +4,7 @@ import dash_table as dt
 
 from dash_cytoscape import Cytoscape
 from propnet.web.utils import graph_conversion, GRAPH_LAYOUT_CONFIG, \
-    GRAPH_SETTINGS, GRAPH_STYLESHEET, propnet_nx_graph, update_labels
+    GRAPH_SETTINGS, GRAPH_STYLESHEET, propnet_nx_graph, get_label_stylesheet, cache
 
 import json
 from monty.json import MontyEncoder, MontyDecoder
@@ -13,6 +13,7 @@ from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
 from collections import OrderedDict
+from functools import lru_cache
 
 # noinspection PyUnresolvedReferences
 import propnet.symbols
@@ -26,9 +27,23 @@ from propnet.core.graph import Graph
 from propnet.ext.matproj import MPRester
 from propnet.ext.aflow import AflowAdapter
 
-MPR = MPRester()
-AFA = AflowAdapter()
-graph_evaluator = Graph(parallel=True, max_workers=4)
+
+# The database clients and the graph evaluator, which starts a pool of worker
+# processes, are only set up when they are first needed, not on import
+@lru_cache(maxsize=None)
+def get_mpr():
+    return MPRester()
+
+
+@lru_cache(maxsize=None)
+def get_afa():
+    return AflowAdapter()
+
+
+@lru_cache(maxsize=None)
+def get_graph_evaluator():
+    return Graph(parallel=True, max_workers=4)
+
 
 # explicitly making this an OrderedDict so we can go back from the
 # display name to the symbol name
@@ -91,6 +106,45 @@ DATA_TABLE_STYLE = dict(
 )
 
 
+@cache.memoize(timeout=86400)
+def retrieve_material_data(query):
+    """Retrieves a material from the Materials Project or AFLOW. Results are
+    cached, as the same queries are commonly made repeatedly and each needs
+    one or two requests to the external database.
+
+    Args:
+      query (str): formula, Materials Project ID or AFLOW ID
+
+    Returns:
+      (str) JSON of the material's quantities keyed by display name,
+      or None if no material was found
+
+    """
+    if query.startswith("aflow"):
+        identifier = query
+        material = get_afa().get_material_by_auid(identifier)
+        formula_field = 'formula'
+    else:
+        if query.startswith("mp-") or query.startswith("mvc-"):
+            identifier = query
+        else:
+            identifier = get_mpr().get_mpid_from_formula(query)
+        material = get_mpr().get_material_for_mpid(identifier)
+        formula_field = 'pretty_formula'
+
+    if not material:
+        return None
+
+    formula = material[formula_field]
+    logger.info("Retrieved material {} for formula {}".format(
+        identifier, formula))
+
+    db_quantities = {quantity.symbol.display_names[0]: quantity.as_dict()
+                     for quantity in material.get_quantities()}
+
+    return json.dumps(db_quantities, cls=MontyEncoder)
+
+
 def interactive_layout(app):
 
     layout = html.Div([
@@ -145,7 +199,30 @@ def interactive_layout(app):
         dcc.Checklist(id='aggregate', options=[{'label': 'Aggregate', 'value': 'aggregate'}],
                       value=['aggregate'], style={'display': 'inline-block'}),
         html.Br(),
-        html.Div(id='propnet-output', style={'width': '1225px'}),
+        # The output components are only shown once there is output, and the
+        # callbacks update their data rather than replacing the components
+        html.Div(id='propnet-output', style={'display': 'none'}, children=[
+            dcc.Checklist(id='material-graph-options',
+                          options=[{'label': 'Show models',
+                                    'value': 'show_models'},
+                                   {'label': 'Show properties',
+                                    'value': 'show_properties'}],
+                          value=['show_properties'],
+                          labelStyle={'display': 'inline-block'}),
+            Cytoscape(
+                id='material-graph',
+                elements=[],
+                stylesheet=GRAPH_STYLESHEET,
+                layout=GRAPH_LAYOUT_CONFIG,
+                **GRAPH_SETTINGS['full_view']
+            ),
+            html.Br(),
+            dt.DataTable(id='output-table',
+                         data=[],
+                         columns=[{'id': val, 'name': val}
+                                  for val in ('Property', 'Value')],
+                         editable=False, **DATA_TABLE_STYLE)
+        ]),
         html.Br()
     ])
 
@@ -158,29 +235,12 @@ def interactive_layout(app):
         if (n_clicks is None) and (n_submit is None) or query == "":
             raise PreventUpdate
 
-        if query.startswith("aflow"):
-            identifier = query
-            material = AFA.get_material_by_auid(identifier)
-            formula_field = 'formula'
-        else:
-            if query.startswith("mp-") or query.startswith("mvc-"):
-                identifier = query
-            else:
-                identifier = MPR.get_mpid_from_formula(query)
-            material = MPR.get_material_for_mpid(identifier)
-            formula_field = 'pretty_formula'
-
-        if not material:
-            raise PreventUpdate
-
-        formula = material[formula_field]
-        logger.info("Retrieved material {} for formula {}".format(
-            identifier, formula))
+        data = retrieve_material_data(query)
 
-        db_quantities = {quantity.symbol.display_names[0]: quantity.as_dict()
-                         for quantity in material.get_quantities()}
+        if data is None:
+            raise PreventUpdate
 
-        return json.dumps(db_quantities, cls=MontyEncoder)
+        return data
 
     @app.callback(
         Output('db-table', 'data'),
@@ -210,12 +270,27 @@ def interactive_layout(app):
         return True
 
     @app.callback(
-        Output('propnet-output', 'children'),
+        Output('material-graph', 'stylesheet'),
+        [Input('material-graph-options', 'value')]
+    )
+    def change_material_graph_label_selection(graph_options):
+        # Labels are toggled in the stylesheet, so the graph elements
+        # don't have to be sent back to be updated
+        return get_label_stylesheet(show_models='show_models' in graph_options,
+                                    show_symbols='show_properties' in graph_options)
+
+    @app.callback(
+        [Output('material-graph', 'elements'),
+         Output('output-table', 'data'),
+         Output('propnet-output', 'style')],
         [Input('input-table', 'data'),
          Input('db-data', 'data'),
-         Input('aggregate', 'value')]
+         Input('aggregate', 'value')],
+        [State('material-graph-options', 'value')]
     )
-    def evaluate(input_rows, data, aggregate):
+    def evaluate(input_rows, data, aggregate, graph_options):
+        show_properties = 'show_properties' in graph_options
+        show_models = 'show_models' in graph_options
 
         quantities = [QuantityFactory.create_quantity(symbol_type=ROW_IDX_TO_SYMBOL_NAME[idx],
                                                       value=ureg.parse_expression(row['Editable Value']),
@@ -233,79 +308,43 @@ def interactive_layout(app):
         for quantity in quantities:
             material.add_quantity(quantity)
 
-        output_material = graph_evaluator.evaluate(material, timeout=5)
+        output_material = get_graph_evaluator().evaluate(material, timeout=5)
+
+        # get_quantities() builds a new list each time, so only call it once
+        all_quantities = output_material.get_quantities()
 
         if aggregate:
             aggregated_quantities = output_material.get_aggregated_quantities()
-            non_aggregatable_quantities = [v for v in output_material.get_quantities()
+            non_aggregatable_quantities = [v for v in all_quantities
                                            if v.symbol not in aggregated_quantities]
             output_quantities = list(aggregated_quantities.values()) + non_aggregatable_quantities
         else:
-            output_quantities = output_material.get_quantities()
+            output_quantities = all_quantities
 
         output_rows = [{
             'Property': quantity.symbol.display_names[0],
             'Value': quantity.pretty_string(sigfigs=3)
         } for quantity in output_quantities]
 
-        output_table = dt.DataTable(id='output-table',
-                                    data=output_rows,
-                                    columns=[{'id': val, 'name': val}
-                                             for val in ('Property', 'Value')],
-                                    editable=False, **DATA_TABLE_STYLE)
-
         # TODO: clean up
 
         input_quantity_names = [q.symbol for q in quantities]
         derived_quantity_names = \
-            set([q.symbol for q in output_quantities]) - \
-            set(input_quantity_names)
+            {q.symbol for q in output_quantities} - set(input_quantity_names)
 
-        models_evaluated = set(output_q.provenance.model
-                               for output_q in output_material.get_quantities())
-        models_evaluated = [Registry("models").get(m) for m in models_evaluated
-                            if Registry("models").get(m) is not None]
+        models = Registry("models")
+        models_evaluated = {output_q.provenance.model for output_q in all_quantities}
+        models_evaluated = [model for model in map(models.get, models_evaluated)
+                            if model is not None]
 
         material_graph_data = graph_conversion(
             propnet_nx_graph,
             derivation_pathway={'inputs': input_quantity_names,
                                 'outputs': list(derived_quantity_names),
-                                'models': models_evaluated})
-
-        output_graph = html.Div(
-            children=[
-                dcc.Checklist(id='material-graph-options',
-                              options=[{'label': 'Show models',
-                                        'value': 'show_models'},
-                                       {'label': 'Show properties',
-                                        'value': 'show_properties'}],
-                              value=['show_properties'],
-                              labelStyle={'display': 'inline-block'}),
-                Cytoscape(
-                    id='material-graph',
-                    elements=material_graph_data,
-                    stylesheet=GRAPH_STYLESHEET,
-                    layout=GRAPH_LAYOUT_CONFIG,
-                    **GRAPH_SETTINGS['full_view']
-                    )
-            ]
-        )
-
-        return [
-            output_graph,
-            html.Br(),
-            output_table
-        ]
-
-    @app.callback(Output('material-graph', 'elements'),
-                  [Input('material-graph-options', 'value')],
-                  [State('material-graph', 'elements')])
-    def change_material_graph_label_selection(props, elements):
-        show_properties = 'show_properties' in props
-        show_models = 'show_models' in props
-
-        update_labels(elements, show_models=show_models, show_symbols=show_properties)
+                                'models': models_evaluated},
+            show_symbol_labels=show_properties,
+            show_model_labels=show_models)
 
-        return elements
+        return material_graph_data, output_rows, {'width': '1225px'}
 
     return layout
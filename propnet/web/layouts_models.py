@@ -1,4 +1,6 @@
 from collections import OrderedDict
+from copy import deepcopy
+from functools import lru_cache
 
 import dash_html_components as html
 import dash_core_components as dcc
@@ -22,6 +24,35 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def model_graph_data(model_name):
+    """Converts the part of the propnet graph around a model for display.
+    The graph does not change while the app runs, so this is only done
+    once per model rather than every time its page is loaded.
+
+    Args:
+      model_name (str): a model name
+
+    Returns:
+      graph dict (see graph_conversion()), a copy of the cached data
+      so that callers can modify it
+
+    """
+    return deepcopy(_model_graph_data(model_name, Registry("models").version))
+
+
+@lru_cache(maxsize=256)
+def _model_graph_data(model_name, registry_version):
+    """Cached implementation of model_graph_data(), the registry version is only
+    used as part of the cache key so that re-registered models are converted
+    again.
+    """
+    model = Registry("models")[model_name]
+    # TODO: costly, should just construct subgraph directly?
+    subgraph = nx.ego_graph(propnet_nx_graph, model, undirected=True)
+    return graph_conversion(subgraph,
+                            show_symbol_labels=True, show_model_labels=True)
+
+
 # layouts for model detail pages
 def model_layout(model_name):
     """Create a Dash layout for a provided model.
@@ -47,11 +78,7 @@ def model_layout(model_name):
         ]
     )
 
-    # TODO: costly, should just construct subgraph directly?
-
-    subgraph = nx.ego_graph(propnet_nx_graph, model, undirected=True)
-    subgraph_data = graph_conversion(subgraph,
-                                     show_symbol_labels=True, show_model_labels=True)
+    subgraph_data = model_graph_data(model_name)
     if len(subgraph_data) < 50:
         graph_config = GRAPH_LAYOUT_CONFIG.copy()
         graph_config['maxSimulationTime'] = 1500
@@ -174,12 +201,16 @@ for model_name, model in Registry("models").items():
         if tag not in model_links:
             model_links[tag] = []
 
-    for tag in model.categories:
-        passes = model.validate_from_preset_test()
-        passes = "✅" if passes else "❌"
+    if not model.categories:
+        continue
 
-        link_text = "{}".format(model.title)
+    # Models are listed under each of their tags, but only need validating once
+    passes = model.validate_from_preset_test()
+    passes = "✅" if passes else "❌"
 
+    link_text = "{}".format(model.title)
+
+    for tag in model.categories:
         model_links[tag].append(
             html.Div([
                 html.Span('{} '.format(passes)),
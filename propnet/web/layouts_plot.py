@@ -7,13 +7,12 @@ import numpy as np
 
 from os import environ
 from random import choice
+from functools import lru_cache
 from monty.serialization import loadfn
 
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 
-from pydash import set_
-
 from pymatgen import MPRester
 from pymatgen.util.string import unicodeify
 
@@ -24,7 +23,12 @@ from propnet.dbtools.correlation import CorrelationBuilder
 
 from pymongo.errors import ServerSelectionTimeoutError
 
-mpr = MPRester()
+
+@lru_cache(maxsize=None)
+def get_mpr():
+    # Only set up the MPRester when it is first needed, not on import
+    return MPRester()
+
 
 try:
     store = loadfn(environ["PROPNET_STORE_FILE"])
@@ -215,7 +219,7 @@ def define_plot_callbacks(app):
         y = point['y']
         print(point)
 
-        s = mpr.get_structure_by_material_id(mpid)
+        s = get_mpr().get_structure_by_material_id(mpid)
         formula = unicodeify(s.composition.reduced_formula)
 
         info = f"""
@@ -379,12 +383,14 @@ def get_graph_figure(data, zoom, enable_z, enable_color, color_range):
                                        scalar_symbols[color_prop].unit_as_string)
         if not color_range:
             color_range = get_color_range(c, zoom)
-        set_(trace, 'marker.color', c)
-        set_(trace, 'marker.colorscale', 'Viridis')
-        set_(trace, 'marker.showscale', True)
-        set_(trace, 'marker.colorbar', {'title': color_title})
-        set_(trace, 'marker.cmin', color_range[0])
-        set_(trace, 'marker.cmax', color_range[1])
+        trace['marker'].update({
+            'color': c,
+            'colorscale': 'Viridis',
+            'showscale': True,
+            'colorbar': {'title': color_title},
+            'cmin': color_range[0],
+            'cmax': color_range[1]
+        })
 
     x_title = "{} / {}".format(scalar_symbols[x_prop].display_names[0],
                                scalar_symbols[x_prop].unit_as_string)
@@ -400,10 +406,10 @@ def get_graph_figure(data, zoom, enable_z, enable_color, color_range):
     }
 
     if zoom:
-        set_(axes_layout, 'xaxis.range', [np.percentile(x, 10),
-                                          np.percentile(x, 90)])
-        set_(axes_layout, 'yaxis.range', [np.percentile(y, 10),
-                                          np.percentile(y, 90)])
+        axes_layout['xaxis']['range'] = [np.percentile(x, 10),
+                                         np.percentile(x, 90)]
+        axes_layout['yaxis']['range'] = [np.percentile(y, 10),
+                                         np.percentile(y, 90)]
     layout = {
         'hovermode': 'closest',
         'margin': {'t': 20}
@@ -417,12 +423,12 @@ def get_graph_figure(data, zoom, enable_z, enable_color, color_range):
         z_title = "{} / {}".format(scalar_symbols[z_prop].display_names[0],
                                    scalar_symbols[z_prop].unit_as_string)
 
-        set_(axes_layout, 'zaxis', {'title': z_title, 'showgrid': True, 'showline': True,
-                                     'zeroline': False})
+        axes_layout['zaxis'] = {'title': z_title, 'showgrid': True, 'showline': True,
+                                'zeroline': False}
 
         if zoom:
-            set_(axes_layout, 'zaxis.range', [np.percentile(z, 10),
-                                              np.percentile(z, 90)])
+            axes_layout['zaxis']['range'] = [np.percentile(z, 10),
+                                             np.percentile(z, 90)]
         scatter = go.Scatter3d(**trace)
         layout['scene'] = axes_layout
     else:
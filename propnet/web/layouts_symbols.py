@@ -3,6 +3,8 @@ import dash_core_components as dcc
 from dash_cytoscape import Cytoscape
 
 import networkx as nx
+from copy import deepcopy
+from functools import lru_cache
 
 from propnet.web.utils import graph_conversion, GRAPH_LAYOUT_CONFIG, \
     GRAPH_STYLESHEET, GRAPH_SETTINGS, propnet_nx_graph
@@ -12,6 +14,35 @@ import propnet.symbols
 from propnet.core.registry import Registry
 
 
+def symbol_graph_data(symbol_name):
+    """Converts the part of the propnet graph around a symbol for display.
+    The graph does not change while the app runs, so this is only done
+    once per symbol rather than every time its page is loaded.
+
+    Args:
+      symbol_name (str): a symbol name
+
+    Returns:
+      graph dict (see graph_conversion()), a copy of the cached data
+      so that callers can modify it
+
+    """
+    return deepcopy(_symbol_graph_data(symbol_name, Registry("symbols").version))
+
+
+@lru_cache(maxsize=256)
+def _symbol_graph_data(symbol_name, registry_version):
+    """Cached implementation of symbol_graph_data(), the registry version is only
+    used as part of the cache key so that re-registered symbols are converted
+    again.
+    """
+    symbol = Registry("symbols")[symbol_name]
+    # TODO: costly, should just construct subgraph directly?
+    subgraph = nx.ego_graph(propnet_nx_graph, symbol, undirected=True, radius=2)
+    return graph_conversion(subgraph,
+                            show_model_labels=True, show_symbol_labels=True)
+
+
 # layouts for symbol detail pages
 def symbol_layout(symbol_name):
     """Create a Dash layout for a provided symbol.
@@ -32,10 +63,7 @@ def symbol_layout(symbol_name):
     main_name = symbol.display_names[0]
 
     layouts.append(html.H6('Graph'))
-    # TODO: costly, should just construct subgraph directly?
-    subgraph = nx.ego_graph(propnet_nx_graph, symbol, undirected=True, radius=2)
-    subgraph_data = graph_conversion(subgraph,
-                                     show_model_labels=True, show_symbol_labels=True)
+    subgraph_data = symbol_graph_data(symbol_name)
 
     if len(subgraph_data) < 50:
         graph_config = GRAPH_LAYOUT_CONFIG.copy()
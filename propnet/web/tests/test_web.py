@@ -3,13 +3,15 @@ import json
 
 from propnet.core.graph import Graph
 from propnet.core.registry import Registry
+from propnet.core.symbols import Symbol
 from propnet.models import add_builtin_models_to_registry
 import os
 
 no_store_file = os.environ.get('PROPNET_STORE_FILE') is None
 if not no_store_file:
     from propnet.web.app import app, symbol_layout, model_layout
-    from propnet.web.utils import graph_conversion
+    from propnet.web.utils import graph_conversion, get_label_stylesheet, parse_path
+    from propnet.web.layouts_symbols import symbol_graph_data
 
 routes = [
     '/'
@@ -65,6 +67,28 @@ class WebTest(unittest.TestCase):
         self.assertIn({'source': 'band_gap', "target": "Is Metallic"},
                       [n['data'] for n in converted if n['group'] == 'edges'])
 
+    def test_label_stylesheet(self):
+        stylesheet = get_label_stylesheet(show_models=False, show_symbols=True)
+        # The label rules for each node type come last, so they take precedence
+        self.assertEqual([rule['selector'] for rule in stylesheet[-2:]],
+                         ['.model', '.symbol'])
+        self.assertEqual(stylesheet[-2]['style']['content'], "")
+        self.assertEqual(stylesheet[-1]['style']['content'], "data(label)")
+        self.assertEqual(stylesheet[-1]['style']['shape'], 'rectangle')
+
+    def test_parse_path_registry_changes(self):
+        self.assertIsNone(parse_path('/property/late_symbol')['value'])
+        symbol = Symbol('late_symbol', units='meter')
+        self.addCleanup(symbol.unregister)
+        self.assertEqual(parse_path('/property/late_symbol')['value'], 'late_symbol')
+        with self.assertRaises(TypeError):
+            parse_path('/property/late_symbol')['value'] = 'band_gap'
+
+    def test_graph_data_copies(self):
+        data = symbol_graph_data('band_gap')
+        data.clear()
+        self.assertNotEqual(symbol_graph_data('band_gap'), [])
+
     def tearDown(self):
         pass
 
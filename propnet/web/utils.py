@@ -2,6 +2,8 @@ import logging
 
 from os import path
 import re
+from functools import lru_cache
+from types import MappingProxyType
 from urllib.parse import parse_qs, urlsplit
 
 from propnet.core.symbols import Symbol
@@ -9,6 +11,7 @@ from propnet.core.models import Model
 
 from monty.serialization import loadfn
 import networkx as nx
+from flask_caching import Cache
 
 from propnet.core.graph import Graph
 # noinspection PyUnresolvedReferences
@@ -28,6 +31,59 @@ SUBGRAPH_HEIGHT_PX = re.match(r'^([0-9]+)[^0-9]*',
 
 propnet_nx_graph = Graph().get_networkx_graph()
 
+# Bound to the app server in app.py, so it can only be used in callbacks
+cache = Cache()
+
+
+# TODO: need to clean up after model refactor
+def _get_node_id(node_):
+    return node_.title if isinstance(node_, Model) else node_.name
+
+
+def _graph_topology(graph: nx.DiGraph):
+    """Collects the parts of a networkx graph from Graph.graph that are
+    needed to render it, which only depend on the graph itself.
+
+    Args:
+        graph (networkx.graph): from Graph.graph
+
+    Returns: (list<tuple>, list<tuple>) nodes as (id, label, node type) tuples
+        and edges as (source id, target id) tuples
+    """
+    nodes = []
+    # The id of each node is worked out once and reused for its edges
+    id_map = {}
+
+    for n in graph.nodes():
+
+        # should do better parsing of nodes here
+        # TODO: this is also horrific code for demo, change
+        # TODO: more dumb crap related to graph
+        if isinstance(n, Symbol):
+            # property
+            id_map[n] = n.name
+            nodes.append((n.name, n.display_names[0], 'symbol'))
+        elif isinstance(n, Model):
+            # model
+            id_map[n] = n.title
+            nodes.append((n.title, n.title, 'model'))
+        else:
+            id_map[n] = _get_node_id(n)
+
+    edges = []
+    for n1, n2 in graph.edges():
+        id_n1 = id_map[n1]
+        id_n2 = id_map[n2]
+
+        if id_n1 and id_n2:
+            edges.append((id_n1, id_n2))
+
+    return nodes, edges
+
+
+# The propnet graph does not change, so its topology is only collected once
+_PROPNET_GRAPH_TOPOLOGY = _graph_topology(propnet_nx_graph)
+
 
 # TODO: use the attributes of the graph class, rather than networkx
 def graph_conversion(graph: nx.DiGraph,
@@ -43,31 +99,32 @@ def graph_conversion(graph: nx.DiGraph,
 
     Returns: graph dict
     """
+    if graph is propnet_nx_graph:
+        node_info, edge_info = _PROPNET_GRAPH_TOPOLOGY
+    else:
+        node_info, edge_info = _graph_topology(graph)
 
-    nodes = []
     edges = {}
+    connected_nodes = set()
 
-    for n in graph.nodes():
-
-        # should do better parsing of nodes here
-        # TODO: this is also horrific code for demo, change
-        # TODO: more dumb crap related to graph
-        if isinstance(n, Symbol):
-            # property
-            name = n.name
-            label = n.display_names[0]
-            node_type = 'symbol'
-        elif isinstance(n, Model):
-            # model
-            name = n.title
-            label = n.title
-            node_type = 'model'
+    for id_n1, id_n2 in edge_info:
+        connected_nodes.add(id_n1)
+        connected_nodes.add(id_n2)
+        if (id_n2, id_n1) in edges:
+            edges[(id_n2, id_n1)]['classes'].append('is-output')
         else:
-            name = None
-            label = None
-            node_type = None
+            edges[(id_n1, id_n2)] = {
+                'data': {'source': id_n1, 'target': id_n2},
+                'classes': ['is-input']}
+
+    # Unconnected nodes are hidden when a derivation pathway is shown,
+    # so they are skipped rather than built and filtered out afterwards
+    show_unconnected_nodes = not hide_unconnected_nodes or not derivation_pathway
+
+    nodes = []
 
-        if name:
+    for name, label, node_type in node_info:
+        if name and (show_unconnected_nodes or name in connected_nodes):
             # Get node, labels, name, and title
             node = {
                 'data': {'id': name,
@@ -85,27 +142,7 @@ def graph_conversion(graph: nx.DiGraph,
 
             nodes.append(node)
 
-    connected_nodes = set()
-
-    # TODO: need to clean up after model refactor
-    def get_node_id(node_):
-        return node_.title if isinstance(node_, Model) else node_.name
-
-    for n1, n2 in graph.edges():
-        id_n1 = get_node_id(n1)
-        id_n2 = get_node_id(n2)
-
-        if id_n1 and id_n2:
-            connected_nodes.add(id_n1)
-            connected_nodes.add(id_n2)
-            if (id_n2, id_n1) in edges:
-                edges[(id_n2, id_n1)]['classes'].append('is-output')
-            else:
-                edges[(id_n1, id_n2)] = {
-                    'data': {'source': id_n1, 'target': id_n2},
-                    'classes': ['is-input']}
-
-    if not hide_unconnected_nodes or not derivation_pathway:
+    if show_unconnected_nodes:
         unconnected_edges = {
             (node['data']['id'], 'unattached_symbols'):
                 {'data': {'source': node['data']['id'],
@@ -121,18 +158,15 @@ def graph_conversion(graph: nx.DiGraph,
                 'locked': False,
                 'classes': ['unattached', 'label-on']
             })
-    else:
-        nodes = [node for node in nodes if node['data']['id'] in connected_nodes]
 
     # For highlighting graph derivation
     if derivation_pathway:
-        symbols_in = [get_node_id(s) for s in derivation_pathway['inputs']]
-        symbols_out = [get_node_id(s) for s in derivation_pathway['outputs']]
-        models_evaluated = [get_node_id(m)
-                            for m in derivation_pathway['models']]
+        symbols_in = {_get_node_id(s) for s in derivation_pathway['inputs']}
+        symbols_out = {_get_node_id(s) for s in derivation_pathway['outputs']}
+        models_evaluated = {_get_node_id(m)
+                            for m in derivation_pathway['models']}
 
-        symbol_nodes_in_path = set.union(set(symbols_in),
-                                         set(symbols_out))
+        symbol_nodes_in_path = symbols_in | symbols_out
 
         for edge in edges.values():
             if (edge['data']['source'] in symbol_nodes_in_path and
@@ -173,6 +207,11 @@ def graph_conversion(graph: nx.DiGraph,
     return graph_data
 
 
+# Modes that pages can be routed to, keyed by the first segment of the path
+_PATH_MODES = frozenset(('model', 'property', 'explore', 'plot',
+                         'generate', 'correlate', 'refs', 'home'))
+
+
 def parse_path(pathname, search=None):
     """Utility function to parse URL path for routing purposes etc.
     This function exists because the path has to be parsed in
@@ -183,54 +222,54 @@ def parse_path(pathname, search=None):
       search (str): query string from url
 
     Returns:
-        (dict) dictionary containing 'mode' ('property', 'model' etc.),
-        'value' (name of property etc.)
+        (MappingProxyType) read-only dictionary containing 'mode'
+        ('property', 'model' etc.), 'value' (name of property etc.).
+        Results are cached, so they can't be modified by callers
+
+    """
+    # Names are checked against the registries, so the cached results
+    # are only reused while the registries are unchanged
+    return _parse_path(pathname, search,
+                       Registry("models").version, Registry("symbols").version)
+
 
+@lru_cache(maxsize=256)
+def _parse_path(pathname, search, models_version, symbols_version):
+    """Cached implementation of parse_path(), the registry versions
+    are only used as part of the cache key.
     """
 
     if pathname == '/' or pathname is None:
         return None
 
-    mode = None  # 'property' or 'model'
+    # Pages are routed on the first path segment, e.g. /model/model_name.
+    # Segments that only start with a mode (e.g. /models) are still routed
+    # to that mode, as they were when modes were matched by prefix
+    _, segment, *rest = pathname.split('/') + ['']
+    if segment in _PATH_MODES:
+        mode = segment
+    else:
+        mode = next((m for m in _PATH_MODES if segment.startswith(m)), None)
+
     value = None  # property name / model name
 
-    # TODO: get rid of this
-
-    if pathname == '/model':
-        mode = 'model'
-    elif pathname.startswith('/model'):
-        mode = 'model'
-        for model in Registry("models").keys():
-            if pathname.startswith('/model/{}'.format(model)):
-                value = model
-    elif pathname == '/property':
-        mode = 'property'
-    elif pathname.startswith('/property'):
-        mode = 'property'
-        for property_ in Registry("symbols").keys():
-            if pathname.startswith('/property/{}'.format(property_)):
-                value = property_
-    elif pathname.startswith('/explore'):
-        mode = 'explore'
-    elif pathname.startswith('/plot'):
-        mode = 'plot'
+    # Names are looked up in the registries rather than matched against each key
+    if segment == 'model':
+        if rest[0] in Registry("models"):
+            value = rest[0]
+    elif segment == 'property':
+        if rest[0] in Registry("symbols"):
+            value = rest[0]
+    elif mode == 'plot':
         if search:
             q_vals = parse_qs(urlsplit(search).query)
-            value = {k: v[0] for k, v in q_vals.items()
-                     if k in ('x', 'y', 'z') and v is not None}
-    elif pathname.startswith('/generate'):
-        mode = 'generate'
-    elif pathname.startswith('/correlate'):
-        mode = 'correlate'
-    elif pathname.startswith('/refs'):
-        mode = 'refs'
-    elif pathname.startswith('/home'):
-        mode = 'home'
-
-    return {
+            value = MappingProxyType({k: v[0] for k, v in q_vals.items()
+                                      if k in ('x', 'y', 'z') and v is not None})
+
+    return MappingProxyType({
         'mode': mode,
         'value': value
-    }
+    })
 
 
 def update_labels(elements, show_models=True, show_symbols=True):
@@ -263,3 +302,30 @@ def update_labels(elements, show_models=True, show_symbols=True):
         classes_list.append(class_to_add)
 
         elem['classes'] = " ".join(classes_list)
+
+
+def get_label_stylesheet(show_models=True, show_symbols=True):
+    """
+    Gets the graph stylesheet with the labels of model and symbol nodes
+    shown or hidden, whatever the label classes of the elements are. This
+    lets labels be toggled without sending the graph elements back to the
+    server, as update_labels() would need.
+
+    Args:
+        show_models (bool): True to show the labels of model nodes
+        show_symbols (bool): True to show the labels of symbol nodes
+
+    Returns: (list) cytoscape stylesheet
+
+    """
+    styles = {rule['selector']: rule['style'] for rule in GRAPH_STYLESHEET}
+    stylesheet = list(GRAPH_STYLESHEET)
+    # Later rules take precedence, so these override the label classes
+    for selector, show_labels in (('.model', show_models), ('.symbol', show_symbols)):
+        if show_labels:
+            style = dict(styles['.label-on'], shape=styles[selector]['shape'])
+        else:
+            # Undo the label sizing of .label-on, back to cytoscape's defaults
+            style = dict(styles['.label-off'], width=30, padding=0)
+        stylesheet.append({'selector': selector, 'style': style})
+    return stylesheet
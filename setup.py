@@ -1,16 +1,10 @@
 # !/usr/bin/env python
 
 from setuptools import setup
-import re
 
 with open('requirements.txt', 'r') as f:
-    txt = f.read().split('\n')
-requires = []
-for line in txt:
-    req = re.search(r'^(?![#-])(\S+)\s*#*.*?$', line.strip())
-    if not req:
-        continue
-    requires.append(req.groups()[0])
+    requires = [req for req in (line.split('#', 1)[0].strip() for line in f)
+                if req and not req.startswith('-')]
 
 setup(
     name='propnet',